@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for trait recognition - no game, mouse or Windows needed
+- Replays a directory of panel images (or a video) through the pipeline
+- Or streams synthetic panels (--synthetic N, see rimworld_synth.py)
+- Reports throughput, per-stage latency percentiles and combo precision/recall
+
+    python rimworld_bench.py --frames recorded/ --labels recorded/labels.json
+    python rimworld_bench.py --synthetic 5000 --noise 3 --jpeg 70-95 --repeat 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from rimworld_capture import ReplaySource, load_labels
+from rimworld_ocr import create_ocr_backend, OCR_BACKENDS
+from rimworld_pipeline import TraitPipeline, STAGES
+from rimworld_recognizer import TraitImageDictionary, normalize_trait
+from rimworld_rules import ruleset_from_config
+from rimworld_synth import SyntheticSource, add_generator_args, generator_from_args
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def latency_summary(samples):
+    """{stage: [seconds]} -> {stage: {p50, p95, p99, mean} in ms}"""
+    out = {}
+    for stage, values in samples.items():
+        values = sorted(values)
+        out[stage] = {
+            "p50": percentile(values, 50) * 1000,
+            "p95": percentile(values, 95) * 1000,
+            "p99": percentile(values, 99) * 1000,
+            "mean": (sum(values) / len(values) * 1000) if values else 0.0,
+        }
+    return out
+
+
+def run_benchmark(source, pipeline, labels=None, repeat=1):
+    """Feed every frame of source through pipeline; returns report dict"""
+    samples = {stage: [] for stage in STAGES + ("total",)}
+    ruleset = pipeline.ruleset
+    tp = fp = fn = tn = 0
+    exact = labelled = 0
+    frames = 0
+    busy = 0.0
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(len(source)):
+            source.index = i
+            gray = source.grab(None)
+            t0 = time.perf_counter()
+            result = pipeline.process(gray)
+            dt = time.perf_counter() - t0
+            busy += dt
+            samples["total"].append(dt)
+            for stage, dt in result.timings.items():
+                samples[stage].append(dt)
+            frames += 1
+
+            truth = labels.get(source.key) if labels else None
+            if truth is None:
+                continue
+
+            # Combo detection = a "stop" rule fired
+            truth_traits = [normalize_trait(t) for t in truth]
+            truth_rule = ruleset.evaluate(ruleset.mask(truth_traits))
+            want = truth_rule is not None and truth_rule.action == "stop"
+            got = result.rule is not None and result.rule.action == "stop"
+            tp += want and got
+            fp += got and not want
+            fn += want and not got
+            tn += not want and not got
+
+            # Recognition accuracy = exact set of canonical traits
+            seen = {pipeline.matcher.match(t)[0] for t in result.traits} - {None}
+            exact += seen == set(truth_traits)
+            labelled += 1
+    elapsed = time.perf_counter() - start
+
+    # Throughput counts pipeline time only, not loading/generating frames
+    recognizer = pipeline.recognizer
+    report = {
+        "frames": frames,
+        "seconds": busy,
+        "wall_seconds": elapsed,
+        "frames_per_sec": frames / busy if busy else 0.0,
+        "latency_ms": latency_summary(samples),
+        "cache": {"entries": len(recognizer.dictionary), "hits": recognizer.hits, "ocr": recognizer.misses},
+    }
+    if labelled:
+        report["accuracy"] = {
+            "labelled": labelled,
+            "exact_traits": exact / labelled,
+            "combo_precision": tp / (tp + fp) if tp + fp else 1.0,
+            "combo_recall": tp / (tp + fn) if tp + fn else 1.0,
+            "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        }
+    return report
+
+
+def print_report(report, out=sys.stdout):
+    out.write(f"Frames: {report['frames']} in {report['seconds']:.2f}s = {report['frames_per_sec']:.1f} frames/s\n")
+    out.write(f"{'stage':<10} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8}  (ms)\n")
+    for stage, lat in report["latency_ms"].items():
+        out.write(f"{stage:<10} {lat['p50']:8.2f} {lat['p95']:8.2f} {lat['p99']:8.2f} {lat['mean']:8.2f}\n")
+    cache = report["cache"]
+    out.write(f"Trait cache: {cache['entries']} entries, {cache['hits']} hits / {cache['ocr']} OCR\n")
+    acc = report.get("accuracy")
+    if acc:
+        out.write(f"Exact traits: {acc['exact_traits']:.1%} of {acc['labelled']} labelled frames\n")
+        out.write(f"Combo precision: {acc['combo_precision']:.1%}  recall: {acc['combo_recall']:.1%}"
+                  f"  (tp={acc['tp']} fp={acc['fp']} fn={acc['fn']} tn={acc['tn']})\n")
+
+
+def load_config(path):
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Offline trait recognition benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--frames", help="Directory of panel images, or a video file")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Stream N generated panels instead")
+    parser.add_argument("--labels", help="Ground truth: JSON {frame: [traits]} or JSON lines")
+    parser.add_argument("--config", default="rimworld_config.json", help="Rules / lists to evaluate")
+    parser.add_argument("--ocr", choices=OCR_BACKENDS, help="OCR backend (default: from config)")
+    parser.add_argument("--threads", type=int, help="Parallel OCR threads (default: from config)")
+    parser.add_argument("--cache", default=None, help="Trait image cache file (default: start empty)")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the frames (2+ shows warm cache)")
+    parser.add_argument("--json", help="Also write the report as JSON here")
+    add_generator_args(parser.add_argument_group("synthetic panels"))
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    config = load_config(args.config)
+
+    ocr = create_ocr_backend(args.ocr or config.get("ocr_backend", "auto"))
+    dictionary = TraitImageDictionary(path=args.cache) if args.cache else TraitImageDictionary(path=os.devnull)
+    if args.cache:
+        dictionary.load()
+    pipeline = TraitPipeline.build(ocr, ruleset_from_config(config), dictionary,
+                                   match_distance=int(config.get("match_distance", 2)),
+                                   workers=args.threads or int(config.get("ocr_threads", 1)))
+    if args.synthetic:
+        source = SyntheticSource(generator_from_args(args), args.synthetic)
+        labels = source.labels
+    else:
+        source = ReplaySource(args.frames)
+        labels = load_labels(args.labels) if args.labels else None
+
+    try:
+        report = run_benchmark(source, pipeline, labels, repeat=max(1, args.repeat))
+    finally:
+        pipeline.close()
+        ocr.close()
+
+    report["ocr_backend"] = ocr.name
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Adaptive roll cadence
+- AIMD on the minimum time per roll: shave a fixed step off while clicks land,
+  back off multiplicatively once dropped/duplicate clicks exceed the error budget
+- Inputs per roll: redraw time after the click and how many clicks went wrong
+- Redraw time (EWMA) sets how long to wait for the panel before clicking again,
+  and is the floor of the interval - a roll can't be shorter than the game's redraw,
+  so shaving below it only makes the next backoff start from nothing
+"""
+
+
+class CadenceController:
+    def __init__(self, interval=0.025, min_interval=0.0, max_interval=0.5, error_budget=0.02,
+                 step=0.001, backoff=1.5, alpha=0.05, timeout_factor=4.0, min_timeout=0.03):
+        self.interval = interval          # Current minimum seconds per roll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.error_budget = error_budget  # Acceptable share of rolls with a dropped/duplicate click
+        self.step = step                  # Additive speed-up per clean roll
+        self.backoff = backoff            # Multiplicative slow-down over budget
+        self.alpha = alpha                # EWMA weight of the newest roll
+        self.error_rate = 0.0
+        self.redraw = None                # EWMA of redraw time after a click (s)
+        self.timeout_factor = timeout_factor  # Click timeout = this many typical redraws
+        self.min_timeout = min_timeout
+        self.backoffs = 0
+
+    def update(self, redraw=None, errors=0):
+        """One roll done - redraw seconds (None if the panel never changed), errors = bad clicks"""
+        a = self.alpha
+        self.error_rate += a * ((1.0 if errors else 0.0) - self.error_rate)
+        if redraw is not None:
+            self.redraw = redraw if self.redraw is None else self.redraw + a * (redraw - self.redraw)
+
+        if errors and self.error_rate > self.error_budget:
+            self.interval = min(self.max_interval, max(self.interval, self.step) * self.backoff)
+            self.backoffs += 1
+        elif not errors and self.error_rate <= self.error_budget:
+            # Only speed up while inside the budget, otherwise hold until the rate recovers
+            self.interval = max(self.min_interval, self.interval - self.step)
+        if self.redraw is not None:
+            self.interval = min(self.max_interval, max(self.interval, self.redraw))
+        return self.interval
+
+    def click_timeout(self, limit):
+        """Seconds to wait for a redraw before re-clicking - a few typical redraws, at most limit"""
+        if self.redraw is None:
+            return limit
+        return min(limit, max(self.min_timeout, self.redraw * self.timeout_factor))
+
+    def snapshot(self):
+        return {"interval_ms": round(self.interval * 1000, 1),
+                "error_rate": round(self.error_rate, 4),
+                "redraw_ms": round(self.redraw * 1000, 1) if self.redraw is not None else None,
+                "backoffs": self.backoffs}
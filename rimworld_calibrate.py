@@ -0,0 +1,118 @@
+"""
+Capture region calibration
+- The default panel offset/size was measured at 1440p and 100% UI scale
+- After F7 a wider area around the expected panel is searched for trait cells
+  (bright text boxes that read as known traits); the box is the tight block plus
+  about one row of room below it
+- Boxes are relative to the button, so they are cached per resolution + UI scale only
+  (the game's UI scale isn't readable from the screen - it comes from config "ui_scale")
+- While rolling the box only grows, when text touches its edge (a pawn with more
+  or longer traits than the calibration pawn)
+"""
+
+import json
+import os
+
+import cv2
+
+from rimworld_engine import default_region, region_bbox
+from rimworld_recognizer import segment_cells
+
+CALIBRATION_FILE = "calibration.json"
+
+# Search this much beyond the scaled default panel (fraction of its size, per side)
+SEARCH_MARGIN = (0.5, 0.75)
+PAD = 3  # px kept around the text block
+ROW_SLACK = 0.25  # Extra room below the block, fraction of the default panel height (~one row)
+
+
+def layout_key(screen_size, ui_scale=1.0):
+    return f"{screen_size[0]}x{screen_size[1]}@{float(ui_scale):g}"
+
+
+def search_region(screen_size=None):
+    """Default region widened by SEARCH_MARGIN on every side"""
+    dx, dy, w, h = default_region(screen_size)
+    mx, my = round(w * SEARCH_MARGIN[0]), round(h * SEARCH_MARGIN[1])
+    return (dx - mx, dy - my, w + 2 * mx, h + 2 * my)
+
+
+def find_trait_block(gray, read, threshold=180):
+    """Tight (x0, y0, x1, y1) around cells that read as traits, in gray's coordinates
+    read(binary crop) -> trait name or None"""
+    _, binary = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    box = None
+    for y0, y1, x0, x1 in segment_cells(binary):
+        if not read(binary[y0:y1, x0:x1]):
+            continue
+        box = (x0, y0, x1, y1) if box is None else (
+            min(box[0], x0), min(box[1], y0), max(box[2], x1), max(box[3], y1))
+    if box is None:
+        return None
+    h, w = gray.shape
+    return (max(0, box[0] - PAD), max(0, box[1] - PAD), min(w, box[2] + PAD), min(h, box[3] + PAD))
+
+
+def touches_edge(gray, threshold=180):
+    """Text on the right or bottom edge - the trait block is bigger than the crop"""
+    return gray[:, -1].max() > threshold or gray[-1, :].max() > threshold
+
+
+class CalibrationCache:
+    """{layout key: [dx, dy, w, h]} in calibration.json"""
+
+    def __init__(self, path=CALIBRATION_FILE):
+        self.path = path
+        self.regions = {}
+        self.dirty = False
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.regions = {k: tuple(v) for k, v in json.load(f).items()}
+        self.dirty = False
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({k: list(v) for k, v in self.regions.items()}, f, indent=1)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def get(self, key):
+        return self.regions.get(key)
+
+    def put(self, key, region):
+        region = tuple(int(v) for v in region)
+        if self.regions.get(key) != region:
+            self.regions[key] = region
+            self.dirty = True
+
+    def grow(self, key, region):
+        """Union with the cached region - returns the result"""
+        old = self.regions.get(key)
+        if old:
+            x0, y0 = min(old[0], region[0]), min(old[1], region[1])
+            x1 = max(old[0] + old[2], region[0] + region[2])
+            y1 = max(old[1] + old[3], region[1] + region[3])
+            region = (x0, y0, x1 - x0, y1 - y0)
+        self.put(key, region)
+        return self.regions[key]
+
+
+def calibrate(grab, button, read, screen_size=None):
+    """Search around the button for the trait block -> (dx, dy, w, h) or None
+    grab(bbox) -> grayscale screen area"""
+    bbox = region_bbox(button, search_region(screen_size), screen_size)
+    gray = grab(bbox).copy()
+    block = find_trait_block(gray, read)
+    if block is None:
+        return None
+    # Back to button-relative coordinates (the search box may have been clipped)
+    ox, oy = bbox[0] - button[0], bbox[1] - button[1]
+    x0, y0, x1, y1 = block[0] + ox, block[1] + oy, block[2] + ox, block[3] + oy
+    # A row of room so the next pawn's extra row reaches the edge and triggers a grow
+    y1 += round(default_region(screen_size)[3] * ROW_SLACK)
+    return (x0, y0, x1 - x0, y1 - y0)
@@ -0,0 +1,362 @@
+"""
+Screen capture helpers for the trait roller
+- Capture backends (mss, PIL ImageGrab, fake) writing into reusable buffers
+- FrameChangeDetector: cheap downsampled diff to know when the game redrew
+- ScreenSource / InputSink: live screen + mouse, or replay of recorded frames
+"""
+
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Downsampled size used for change detection (w, h)
+SIGNATURE_SIZE = (64, 24)
+
+CAPTURE_BACKENDS = ("auto", "mss", "imagegrab")
+
+
+class CaptureBackend:
+    """Grabs a screen region straight into a caller-owned grayscale buffer"""
+    name = "base"
+
+    def grab_into(self, bbox, out):
+        """Fill out (h, w uint8) with the grayscale pixels of bbox"""
+        raise NotImplementedError
+
+    def grab_bgr_into(self, bbox, out):
+        """Fill out (h, w, 3 uint8) with the BGR pixels of bbox"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ImageGrabBackend(CaptureBackend):
+    """PIL ImageGrab - works everywhere PIL does, but allocates a new image per grab"""
+    name = "imagegrab"
+
+    def __init__(self):
+        from PIL import ImageGrab
+        self.ImageGrab = ImageGrab
+
+    def grab_into(self, bbox, out):
+        img = self.ImageGrab.grab(bbox=bbox)
+        cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2GRAY, dst=out)
+
+    def grab_bgr_into(self, bbox, out):
+        img = self.ImageGrab.grab(bbox=bbox).convert("RGB")
+        cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR, dst=out)
+
+
+class MssBackend(CaptureBackend):
+    """mss - BitBlt on Windows, XShm/XGetImage on Linux; raw BGRA is viewed without copying"""
+    name = "mss"
+
+    def __init__(self):
+        import mss
+        self.mss = mss
+        # mss handles are per thread
+        self.local = threading.local()
+        self.monitor = {}
+        self._sct()
+
+    def _sct(self):
+        sct = getattr(self.local, "sct", None)
+        if sct is None:
+            sct = self.local.sct = self.mss.mss()
+        return sct
+
+    def _grab_bgra(self, bbox):
+        x0, y0, x1, y1 = bbox
+        mon = self.monitor
+        mon["left"], mon["top"], mon["width"], mon["height"] = x0, y0, x1 - x0, y1 - y0
+        shot = self._sct().grab(mon)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def grab_into(self, bbox, out):
+        cv2.cvtColor(self._grab_bgra(bbox), cv2.COLOR_BGRA2GRAY, dst=out)
+
+    def grab_bgr_into(self, bbox, out):
+        cv2.cvtColor(self._grab_bgra(bbox), cv2.COLOR_BGRA2BGR, dst=out)
+
+    def close(self):
+        sct = getattr(self.local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self.local.sct = None
+
+
+class FakeBackend(CaptureBackend):
+    """Serves given grayscale frames in order (last one repeats) - for tests"""
+    name = "fake"
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.index = 0
+        self.grabs = 0
+
+    def next_frame(self):
+        if self.index + 1 < len(self.frames):
+            self.index += 1
+
+    def grab_into(self, bbox, out):
+        self.grabs += 1
+        np.copyto(out, self.frames[self.index])
+
+    def grab_bgr_into(self, bbox, out):
+        self.grabs += 1
+        frame = self.frames[self.index]
+        if frame.ndim == 2:
+            cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=out)
+        else:
+            np.copyto(out, frame)
+
+
+def create_capture_backend(name="auto"):
+    """mss when available, PIL ImageGrab otherwise"""
+    if name in ("auto", "mss"):
+        try:
+            return MssBackend()
+        except Exception:
+            pass
+    return ImageGrabBackend()
+
+
+def grab_gray(bbox):
+    """One-off grab of bbox as a new grayscale numpy array"""
+    out = np.empty((bbox[3] - bbox[1], bbox[2] - bbox[0]), dtype=np.uint8)
+    ImageGrabBackend().grab_into(bbox, out)
+    return out
+
+
+def panel_signature(gray, out=None):
+    """Tiny area-averaged thumbnail of the panel, cheap to compare"""
+    return cv2.resize(gray, SIGNATURE_SIZE, dst=out, interpolation=cv2.INTER_AREA)
+
+
+class FrameChangeDetector:
+    """Polls the panel until it differs from the previous pawn
+    All thumbnails live in preallocated buffers - no allocations per poll"""
+
+    def __init__(self, threshold=12.0, timeout=1.0, poll=0.005):
+        self.threshold = threshold  # Largest thumbnail cell diff (0-255) that counts as a redraw
+        self.timeout = timeout      # Give up after this many seconds
+        self.poll = poll            # Sleep between polls
+        w, h = SIGNATURE_SIZE
+        self.reference = np.zeros((h, w), dtype=np.uint8)
+        self.has_reference = False
+        self.flickers = 0           # Redraws that settled back on the same pawn
+        self._sig = np.zeros((h, w), dtype=np.uint8)
+        self._last = np.zeros((h, w), dtype=np.uint8)
+        self._diff = np.zeros((h, w), dtype=np.uint8)
+
+    def set_reference(self, gray):
+        """Remember the panel we just analyzed"""
+        panel_signature(gray, self.reference)
+        self.has_reference = True
+
+    def _distance(self, a, b):
+        # Max, not mean - swapping one trait only touches a few cells
+        cv2.absdiff(a, b, dst=self._diff)
+        return cv2.minMaxLoc(self._diff)[1]
+
+    def diff(self, gray):
+        if not self.has_reference:
+            return 255.0
+        return self._distance(panel_signature(gray, self._sig), self.reference)
+
+    def changed(self, gray):
+        return self.diff(gray) > self.threshold
+
+    def wait_for_change(self, grab, timeout=None):
+        """Call grab() until the panel changes and settles - returns (gray, changed)
+        A panel that flickers and settles back on the reference counts as unchanged"""
+        deadline = time.perf_counter() + (self.timeout if timeout is None else timeout)
+        while True:
+            gray = grab()
+            if self.changed(gray):
+                gray = self._settle(grab, gray, deadline)
+                if self._distance(self._sig, self.reference) > self.threshold:
+                    return gray, True
+                self.flickers += 1
+                return gray, False
+            if time.perf_counter() >= deadline:
+                return gray, False
+            time.sleep(self.poll)
+
+    def _settle(self, grab, gray, deadline):
+        """Game may still be drawing - wait until two grabs in a row match"""
+        np.copyto(self._last, self._sig)
+        while time.perf_counter() < deadline:
+            time.sleep(self.poll)
+            gray = grab()
+            panel_signature(gray, self._sig)
+            if self._distance(self._sig, self._last) <= self.threshold:
+                return gray
+            np.copyto(self._last, self._sig)
+        return gray
+
+
+class PanelBuffers:
+    """Reusable gray + binary buffers for one capture size"""
+
+    def __init__(self, width, height):
+        self.gray = np.zeros((height, width), dtype=np.uint8)
+        self.binary = np.zeros((height, width), dtype=np.uint8)
+
+    def fits(self, width, height):
+        return self.gray.shape == (height, width)
+
+
+class ScreenSource:
+    """Where trait panel frames come from"""
+
+    def grab(self, bbox):
+        """Return the panel at bbox as a grayscale numpy array"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InputSink:
+    """Where clicks go"""
+
+    def click(self, pos):
+        raise NotImplementedError
+
+
+class LiveScreen(ScreenSource):
+    """The real screen through a capture backend
+    grab() returns the same preallocated buffer every time - copy it to keep a frame"""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else create_capture_backend()
+        self.buffers = None
+
+    def grab(self, bbox):
+        w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        if self.buffers is None or not self.buffers.fits(w, h):
+            self.buffers = PanelBuffers(w, h)
+        self.backend.grab_into(bbox, self.buffers.gray)
+        return self.buffers.gray
+
+    def close(self):
+        self.backend.close()
+
+
+class PyAutoGuiInput(InputSink):
+    """The real mouse"""
+
+    def __init__(self):
+        from rimworld_engine import load_pyautogui
+        self.pyautogui = load_pyautogui()
+
+    def click(self, pos):
+        self.pyautogui.click(pos)
+
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def load_labels(path):
+    """Labels file -> {frame key: [traits]}
+    JSON object {"frame.png": ["tough", "jogger"]} or JSON lines {"file": ..., "traits": [...]}"""
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+            return {str(r["file"]): r["traits"] for r in rows}
+        return {str(k): v for k, v in json.load(f).items()}
+
+
+class ReplaySource(ScreenSource):
+    """Recorded frames from a directory of images or a video file
+    Each click (via ReplayInput) advances to the next frame
+    Only the current frame is held in memory; video is decoded as the replay advances"""
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.index = 0
+        self.exhausted = False
+        self.video = None
+        self._frame = None
+        self._frame_index = None
+        if os.path.isdir(path):
+            self.keys = sorted(f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTS))
+            self.count = len(self.keys)
+        else:
+            self.keys = None
+            self.video = cv2.VideoCapture(path)
+            self.count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT)) if self.video.isOpened() else 0
+            self._next = 0  # Frame the decoder returns on the next read
+        if not self.count:
+            self.close()
+            raise ValueError(f"No frames found in {path}")
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def key(self):
+        """Label key of the current frame (file name or video frame index)"""
+        return self.keys[self.index] if self.keys is not None else str(self.index)
+
+    def frame(self, i):
+        if i != self._frame_index:
+            if self.video is None:
+                frame = cv2.imread(os.path.join(self.path, self.keys[i]), cv2.IMREAD_GRAYSCALE)
+            else:
+                frame = self._read_video(i)
+                if frame is None:
+                    return self._frame
+            self._frame, self._frame_index = frame, i
+        return self._frame
+
+    def _read_video(self, i):
+        if i != self._next:
+            # Random access (benchmark repeats, looping) - sequential replay never seeks
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ok, frame = self.video.read()
+        self._next = i + 1
+        if not ok:
+            if self._frame is None:
+                raise ValueError(f"No frames found in {self.path}")
+            # The header promised more frames than the file has - it ends here
+            self.count = i
+            self.index = self._frame_index
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def grab(self, bbox):
+        # Frames are already cropped to the panel, bbox is ignored
+        return self.frame(self.index)
+
+    def advance(self):
+        if self.index + 1 < self.count:
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+        else:
+            self.exhausted = True
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+
+class ReplayInput(InputSink):
+    """Clicking the Randomize button = next recorded frame"""
+
+    def __init__(self, source):
+        self.source = source
+        self.clicks = 0
+
+    def click(self, pos):
+        self.clicks += 1
+        self.source.advance()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Command line for the trait roller - no Tk window
+- roll: run the roll engine on the live screen, or on recorded frames
+- bench: offline recognition benchmark (rimworld_bench.py)
+- startup: measure cold start time / memory of GUI and headless modes
+
+    python -m rimworld_cli roll --config rimworld_config.json --button 2167,372
+    python -m rimworld_cli roll --replay recorded/ --no-pause
+    python -m rimworld_cli startup
+"""
+
+import time
+_STARTED = time.perf_counter()
+
+import argparse
+import json
+import subprocess
+import sys
+
+from rimworld_engine import RollEngine, load_config, peak_memory_mb, CONFIG_FILE
+from rimworld_logging import LogWriter
+
+
+def print_line(ts, msg):
+    print(f"{time.strftime('%H:%M:%S', time.localtime(ts))} {msg}", flush=True)
+
+
+def parse_point(text):
+    x, y = text.split(",")
+    return int(x), int(y)
+
+
+# Stages printed in the end-of-run summary
+ROLL_REPORT_STAGES = ("grab", "threshold", "recognize", "match", "click", "wait", "sleep", "roll")
+
+
+def cmd_roll(args):
+    config = load_config(args.config)
+    if args.delay is not None:
+        config["delay"] = str(args.delay)
+    if args.auto_delay:
+        config["adaptive_delay"] = True
+    config["log_ocr"] = args.log_ocr
+    if args.jsonl:
+        config["log_jsonl"] = True
+    if args.metrics_port is not None:
+        config["metrics_port"] = args.metrics_port
+    if args.metrics_out:
+        config["metrics_file"] = args.metrics_out
+
+    logger = LogWriter.from_config(config, on_message=print_line)
+    log = logger.write
+    engine = RollEngine(config, log=log)
+    engine.event = logger.event
+    engine.pause_enabled = not args.no_pause
+    engine.on_hit = lambda rule: log(f"Hit: {rule.name}")
+
+    if args.replay:
+        from rimworld_capture import ReplaySource, ReplayInput
+        # Recorded frames would skew the trait statistics
+        engine.configure({"history_file": ""})
+        engine.screen = ReplaySource(args.replay)
+        engine.input = ReplayInput(engine.screen)
+        engine.button = (0, 0)
+    elif args.button:
+        engine.set_button(parse_point(args.button))
+    else:
+        log("Need --button X,Y (Randomize button position) or --replay DIR")
+        logger.close()
+        return 2
+
+    # Stop after --max-rolls
+    if args.max_rolls:
+        def limit():
+            while engine.is_rolling or engine.rolls == 0:
+                if engine.rolls >= args.max_rolls:
+                    engine.stop()
+                    return
+                time.sleep(0.05)
+        import threading
+        threading.Thread(target=limit, daemon=True).start()
+
+    if args.profile:
+        engine.start_profiler(args.profile_interval / 1000)
+
+    memory = peak_memory_mb()
+    log(f"Startup: {(time.perf_counter() - _STARTED) * 1000:.0f} ms" + (f", {memory:.0f} MB" if memory else ""))
+
+    start = time.perf_counter()
+    try:
+        if not engine.start(threaded=False):
+            return 1
+        elapsed = time.perf_counter() - start
+        log(f"{engine.rolls} rolls in {elapsed:.1f}s = {engine.rolls / elapsed if elapsed else 0:.1f} rolls/s")
+        from rimworld_metrics import format_dashboard
+        for line in format_dashboard(engine.metrics.snapshot(), ROLL_REPORT_STAGES).splitlines():
+            log(line)
+        return 0
+    except KeyboardInterrupt:
+        engine.stop()
+        return 130
+    finally:
+        engine.close()
+        logger.close()
+
+
+# Snippets run in a fresh interpreter to measure cold start
+STARTUP_PROBES = {
+    "headless": "from rimworld_engine import RollEngine; RollEngine()",
+    "gui": "import rimworld_final",
+}
+HEAVY_MODULES = ("cv2", "numpy", "pytesseract", "tesserocr", "pyautogui", "tkinter", "keyboard", "PIL")
+
+_PROBE = """
+import time, json, sys
+t = time.perf_counter()
+{code}
+t = time.perf_counter() - t
+from rimworld_engine import peak_memory_mb
+print(json.dumps({{"ms": t * 1000, "mb": peak_memory_mb(),
+                  "modules": len(sys.modules), "heavy": sorted(m for m in {heavy} if m in sys.modules)}}))
+"""
+
+
+def measure_startup(mode, runs=3):
+    """Best-of-runs import time and peak memory of one mode in a new process"""
+    import os
+    # Run next to the rimworld_* modules, wherever we were started from
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(runs):
+        code = _PROBE.format(code=STARTUP_PROBES[mode], heavy=repr(HEAVY_MODULES))
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=here)
+        if out.returncode != 0:
+            return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result["ms"] < best["ms"]:
+            best = result
+    return best
+
+
+def cmd_startup(args):
+    for mode in args.modes or list(STARTUP_PROBES):
+        r = measure_startup(mode, args.runs)
+        if "error" in r:
+            print(f"{mode:<9} could not start: {r['error']}")
+            continue
+        mb = f"{r['mb']:.1f} MB" if r["mb"] else "? MB"
+        print(f"{mode:<9} {r['ms']:7.1f} ms  {mb:>9}  {r['modules']} modules  heavy: {', '.join(r['heavy']) or '-'}")
+    return 0
+
+
+def cmd_history(args):
+    import os
+    from rimworld_history import open_history, total_rolls, trait_frequencies, co_occurrence, rolls_to_hit, estimate_for_rules
+    from rimworld_recognizer import normalize_trait
+    from rimworld_rules import ruleset_from_config, RuleError
+
+    if not os.path.exists(args.db):
+        print(f"No history at {args.db}")
+        return 1
+    db = open_history(args.db)
+    try:
+        print(f"{total_rolls(db)} rolls")
+        print("\nMost common traits:")
+        for trait, n, share in trait_frequencies(db, args.top):
+            print(f"  {trait:<28}{n:8d}  {share:6.1%}")
+        trait = normalize_trait(args.trait) if args.trait else None
+        print(f"\nSeen together{' with ' + trait if trait else ''}:")
+        for a, b, n in co_occurrence(db, trait, args.top):
+            print(f"  {a} + {b}: {n}")
+        print("\nRolls to first hit per session:")
+        for sid, started, n, hit in rolls_to_hit(db)[-args.top:]:
+            print(f"  #{sid} {time.strftime('%Y-%m-%d %H:%M', time.localtime(started))}  {n:6d}{'' if hit else '  (no hit)'}")
+        try:
+            ruleset = ruleset_from_config(load_config(args.config))
+        except RuleError as e:
+            print(f"\nRule error: {e}")
+            return 1
+        total, hits, expected = estimate_for_rules(db, ruleset)
+        print(f"\nCurrent rules: {hits} hits in {total} rolls - expect ~{expected:.0f} rolls per hit")
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_bench(args):
+    from rimworld_bench import main as bench_main
+    return bench_main(args.bench_args)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="rimworld_cli", description="RimWorld trait roller (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    roll = sub.add_parser("roll", help="Roll until a stop rule matches")
+    roll.add_argument("--config", default=CONFIG_FILE)
+    roll.add_argument("--button", help="Randomize button position X,Y")
+    roll.add_argument("--replay", help="Roll over recorded frames (directory or video) instead of the screen")
+    roll.add_argument("--delay", type=float, help="Override delay (ms)")
+    roll.add_argument("--auto-delay", action="store_true", help="Adapt the delay to redraw time and dropped clicks")
+    roll.add_argument("--max-rolls", type=int, help="Stop after this many pawns")
+    roll.add_argument("--no-pause", action="store_true", help="Don't wait on pause rules")
+    roll.add_argument("--log-ocr", action="store_true", help="Log recognized text for every pawn")
+    roll.add_argument("--jsonl", action="store_true", help="Also write rimworld_log.jsonl with per-roll timings")
+    roll.add_argument("--metrics-port", type=int, help="Serve live metrics on http://127.0.0.1:PORT/metrics")
+    roll.add_argument("--profile", action="store_true",
+                      help="Sample all threads while rolling, write profiles/*.collapsed + *.txt")
+    roll.add_argument("--profile-interval", type=float, default=5.0, help="Sampling interval (ms)")
+    roll.add_argument("--metrics-out", help="Write a metrics snapshot (JSON) here when rolling stops")
+    roll.set_defaults(func=cmd_roll)
+
+    startup = sub.add_parser("startup", help="Measure cold start time and memory")
+    startup.add_argument("modes", nargs="*", help="headless and/or gui (default: both)")
+    startup.add_argument("--runs", type=int, default=3)
+    startup.set_defaults(func=cmd_startup)
+
+    history = sub.add_parser("history", help="Trait statistics from the roll history")
+    history.add_argument("--db", default="rimworld_history.db")
+    history.add_argument("--config", default=CONFIG_FILE, help="Rules for the rolls-per-hit estimate")
+    history.add_argument("--trait", help="Only show traits seen together with this one")
+    history.add_argument("--top", type=int, default=15)
+    history.set_defaults(func=cmd_history)
+
+    bench = sub.add_parser("bench", help="Offline benchmark (same options as rimworld_bench.py)")
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER)
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,710 @@
+"""
+Roll engine - the trait roller without any UI
+- Owns OCR, capture, pipeline, rules and the rolling loop
+- Used by the Tk app (rimworld_final.py) and the command line (rimworld_cli.py)
+- Heavy modules (cv2, numpy, OCR, pyautogui) load on first prepare(), not at import
+"""
+
+import json
+import os
+import threading
+import time
+
+from rimworld_metrics import RollMetrics
+
+CONFIG_FILE = "rimworld_config.json"
+
+DEFAULT_CONFIG = {
+    "list_a": "tough\niron willed\nindustrious",
+    "list_b": "",
+    "delay": "25",
+    "click_timeout_ms": 250,
+    "click_retries": 3,
+    "adaptive_delay": False,
+    "error_budget": 0.02,
+    "ocr_backend": "auto",
+    "ocr_threads": min(4, os.cpu_count() or 1),
+    "match_distance": 2,
+    "auto_calibrate": True,
+    "calibration_file": "calibration.json",
+    "ui_scale": 1.0,
+    "ocr_workers": 0,
+    "frame_cache_size": 4096,
+    "frame_cache_policy": "lru",
+    "frame_cache_file": "frame_cache.json",
+    "rules": [],
+    "capture_backend": "auto",
+    "log_file": "rimworld_log.txt",
+    "log_max_kb": 5 * 1024,
+    "log_backups": 3,
+    "log_jsonl": False,
+    "history_file": "rimworld_history.db",
+    "metrics_port": 0,
+    "metrics_file": "",
+}
+
+# Trait panel relative to the Randomize button (measured at 1440p, 100% UI scale)
+# Other layouts scale this, then calibration (rimworld_calibrate.py) finds the real block
+REFERENCE_HEIGHT = 1440
+PANEL_OFFSET = (-770, 280)
+PANEL_SIZE = (300, 100)
+
+
+def default_region(screen_size=None):
+    """(dx, dy, w, h) relative to the button, scaled from the 1440p measurement"""
+    s = screen_size[1] / REFERENCE_HEIGHT if screen_size else 1.0
+    return (round(PANEL_OFFSET[0] * s), round(PANEL_OFFSET[1] * s),
+            round(PANEL_SIZE[0] * s), round(PANEL_SIZE[1] * s))
+
+
+def region_bbox(button, region, screen_size=None):
+    """Relative region -> absolute (x0, y0, x1, y1), clipped to the screen"""
+    dx, dy, w, h = region
+    x0, y0 = button[0] + dx, button[1] + dy
+    x1, y1 = x0 + w, y0 + h
+    if screen_size:
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(screen_size[0], x1), min(screen_size[1], y1)
+    return (x0, y0, x1, y1)
+
+
+def load_config(path=CONFIG_FILE):
+    """Config file merged over defaults"""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            config.update(json.load(f))
+    return config
+
+
+def save_config(config, path=CONFIG_FILE):
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_pyautogui():
+    """Import pyautogui with its safety pauses disabled for speed"""
+    import pyautogui
+    pyautogui.PAUSE = 0
+    pyautogui.FAILSAFE = False
+    return pyautogui
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB (None if unknown)"""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    except Exception:
+        pass
+    return None
+
+
+class RollEngine:
+    """Screen -> pipeline -> rules -> click, until a stop rule fires"""
+
+    def __init__(self, config=None, log=None):
+        self.config = dict(DEFAULT_CONFIG)
+        if config:
+            self.config.update(config)
+        self.log = log or (lambda msg: None)
+
+        # State
+        self.is_rolling = False
+        self.button = None      # Randomize button (x, y)
+        self.region = None      # Calibrated trait block (dx, dy, w, h) relative to the button
+        self.screen_size = None
+        self.rolls = 0
+        self.pause_enabled = True
+
+        # Callbacks - on_hit(rule) when a stop rule fires, on_stopped() when the loop exits
+        self.on_hit = None
+        self.on_stopped = None
+        # Structured events - event(kind, **fields), e.g. LogWriter.event for JSON Lines
+        self.event = None
+        # Per-stage latency histograms + rolls/sec
+        self.metrics = RollMetrics()
+        self.metrics_server = None
+        # Sampling profiler while toggled on (F8 / --profile)
+        self.profiler = None
+        # Adaptive cadence while rolling with "adaptive_delay"
+        self.cadence = None
+
+        # Created lazily on first prepare()
+        self.ocr = None
+        self.screen = None
+        self.input = None
+        self.pipeline = None
+        self.trait_cache = None
+        self.frame_cache = None
+        self.calibration = None
+        self.history = None
+        self.calibrate_lock = threading.Lock()  # F7 calibrates in the background, F9 may race it
+        self.calibration_failed = False         # No traits found for this button - don't search on every F9
+        self.thread = None
+
+    def configure(self, config):
+        self.config.update(config)
+
+    def set_button(self, pos):
+        """New Randomize button position - the calibrated region no longer applies"""
+        self.button = (int(pos[0]), int(pos[1]))
+        self.region = None
+        self.calibration_failed = False
+
+    def capture_bbox(self):
+        """Trait panel region for the current button position"""
+        return region_bbox(self.button, self.region or default_region(self.screen_size), self.screen_size)
+
+    def live_capture(self):
+        """True when grabbing the real screen (not replayed frames)"""
+        from rimworld_capture import LiveScreen
+        return isinstance(self.screen, LiveScreen)
+
+    def _load_trait_cache(self):
+        from rimworld_recognizer import TraitImageDictionary
+        if self.trait_cache is None:
+            self.trait_cache = TraitImageDictionary()
+            try:
+                self.trait_cache.load()
+            except Exception:
+                pass
+        if self.frame_cache is None and int(self.config["frame_cache_size"]) > 0:
+            from rimworld_framecache import FrameCache
+            try:
+                self.frame_cache = FrameCache(self.config["frame_cache_file"], int(self.config["frame_cache_size"]),
+                                              self.config["frame_cache_policy"])
+            except ValueError as e:
+                self.log(f"{e} - frame cache off")
+                return
+            try:
+                self.frame_cache.load()
+            except Exception:
+                pass
+
+    def _create_screen(self):
+        if self.screen is None:
+            from rimworld_capture import LiveScreen, create_capture_backend
+            self.screen = LiveScreen(create_capture_backend(self.config["capture_backend"]))
+            self.log(f"Capture backend: {self.screen.backend.name}")
+        if self.screen_size is None and self.live_capture():
+            try:
+                size = load_pyautogui().size()
+                self.screen_size = (int(size[0]), int(size[1]))
+            except Exception:
+                pass
+
+    def _trait_reader(self):
+        """read(binary cell) -> known trait or None, plus a cleanup function"""
+        from rimworld_match import TraitMatcher
+        from rimworld_ocr import create_ocr_backend
+        from rimworld_recognizer import TraitRecognizer, KNOWN_TRAITS
+
+        ocr = self.ocr or create_ocr_backend(self.config["ocr_backend"])
+        recognizer = TraitRecognizer(ocr, self.trait_cache)
+        matcher = TraitMatcher(KNOWN_TRAITS)
+
+        def read(crop):
+            text = self.trait_cache.lookup(crop) or recognizer.ocr_cell(crop)
+            return matcher.match(text)[0]
+
+        def done():
+            recognizer.close()
+            if ocr is not self.ocr:
+                ocr.close()
+        return read, done
+
+    def calibrate(self, force=False, grow=False):
+        """Find the trait block near the button (cached per layout) - True if self.region was set or changed
+        grow=True unions a fresh search into the current region (text reached its edge)"""
+        with self.calibrate_lock:
+            return self._calibrate(force, grow)
+
+    def _calibrate(self, force, grow):
+        from rimworld_calibrate import CalibrationCache, calibrate, layout_key
+
+        if not self.button:
+            return False
+        self._load_trait_cache()
+        self._create_screen()
+        if not self.live_capture():
+            return False
+        if self.calibration is None:
+            self.calibration = CalibrationCache(self.config["calibration_file"])
+            try:
+                self.calibration.load()
+            except Exception:
+                pass
+
+        try:
+            ui_scale = float(self.config["ui_scale"])
+        except (TypeError, ValueError):
+            ui_scale = 1.0
+        key = layout_key(self.screen_size or (0, 0), ui_scale)
+        cached = self.calibration.get(key)
+        if cached and not force and not grow:
+            self.region = cached
+            return True
+
+        try:
+            read, done = self._trait_reader()
+        except Exception as e:
+            self.log(f"Calibration failed: {e}")
+            self.calibration_failed = not grow
+            return False
+        try:
+            found = calibrate(self.screen.grab, self.button, read, self.screen_size)
+        finally:
+            done()
+        if found is None:
+            if not grow:
+                self.log("Calibration: no traits found near the button, using the default region")
+                self.calibration_failed = True
+            return False
+
+        old = self.region
+        region = self.calibration.grow(key, found) if grow else found
+        if not grow:
+            self.calibration.put(key, region)
+        self.region = region
+        try:
+            self.calibration.save()
+        except Exception:
+            pass
+        if region != old:
+            dx, dy, w, h = region
+            self.log(f"Trait region: {w}x{h} at {dx:+d},{dy:+d} from button")
+        return region != old
+
+    def prepare(self):
+        """Create OCR / capture / input if needed and compile rules - False on error"""
+        from rimworld_ocr import create_ocr_backend
+
+        # (Re)create OCR engine only if missing or the config changed - worker processes bring their own
+        backend = self.config["ocr_backend"]
+        if self.ocr_workers():
+            pass
+        elif self.ocr is None or (backend != "auto" and self.ocr.name != backend):
+            if self.ocr:
+                self.ocr.close()
+            try:
+                self.ocr = create_ocr_backend(backend)
+            except Exception as e:
+                self.log(f"OCR init failed: {e}")
+                return False
+            self.log(f"OCR backend: {self.ocr.name}")
+
+        # Learned trait images - known traits skip OCR entirely
+        self._load_trait_cache()
+
+        # Capture backend writes into preallocated buffers
+        self._create_screen()
+        if self.input is None:
+            from rimworld_capture import PyAutoGuiInput
+            self.input = PyAutoGuiInput()
+
+        # Every roll goes to the SQLite history (written in batches by its own thread)
+        if self.history is None and self.config.get("history_file"):
+            from rimworld_history import RollHistory
+            try:
+                self.history = RollHistory(self.config["history_file"])
+            except Exception as e:
+                self.log(f"History disabled: {e}")
+                self.config["history_file"] = ""
+
+        # Optional local metrics endpoint
+        port = int(self.config.get("metrics_port") or 0)
+        if port and self.metrics_server is None:
+            from rimworld_metrics import MetricsServer
+            try:
+                self.metrics_server = MetricsServer(self.metrics, port)
+                self.log(f"Metrics: http://127.0.0.1:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                self.log(f"Metrics server failed: {e}")
+
+        return self.compile_rules()
+
+    def compile_rules(self):
+        """Build rule set + recognition pipeline from config rules or the two lists"""
+        from rimworld_pipeline import TraitPipeline
+        from rimworld_rules import ruleset_from_config, RuleError
+
+        try:
+            ruleset = ruleset_from_config(self.config)
+        except RuleError as e:
+            self.log(f"Rule error: {e}")
+            return False
+        if self.config.get("rules"):
+            self.log(f"Using {len(ruleset.rules)} rules from config")
+        if self.history:
+            self.history.set_rules(ruleset)
+            expected = self.history.expected_rolls()
+            if expected:
+                self.log(f"History: {self.history.total} rolls, {self.history.hits} hits - ~{expected:.0f} rolls per hit")
+
+        match_distance = int(self.config["match_distance"])
+        workers = self.ocr_workers()
+        if workers:
+            from rimworld_workers import ProcessPipeline
+            # Keep running workers when only the rules changed
+            p = self.pipeline
+            if (isinstance(p, ProcessPipeline) and len(p.workers) == workers
+                    and p.backend == self.config["ocr_backend"]):
+                p.set_ruleset(ruleset, match_distance)
+                return True
+            if p:
+                p.close()
+            self.pipeline = ProcessPipeline(ruleset, self.trait_cache, backend=self.config["ocr_backend"],
+                                            workers=workers, ocr_threads=max(1, int(self.config["ocr_threads"])),
+                                            match_distance=match_distance, log=self.log,
+                                            frame_cache=self.frame_cache)
+            self.log(f"OCR in {workers} worker process(es)")
+            return True
+
+        if self.pipeline:
+            self.pipeline.close()
+        self.pipeline = TraitPipeline.build(self.ocr, ruleset, self.trait_cache,
+                                            match_distance=match_distance,
+                                            workers=max(1, int(self.config["ocr_threads"])),
+                                            frame_cache=self.frame_cache)
+        return True
+
+    def ocr_workers(self):
+        """Number of OCR worker processes (0 = recognize in this process)"""
+        try:
+            return max(0, int(self.config.get("ocr_workers") or 0))
+        except ValueError:
+            return 0
+
+    def start(self, threaded=True):
+        """Prepare and start rolling - in a thread, or blocking if threaded=False"""
+        if self.is_rolling:
+            return False
+        if not self.button:
+            self.log("Set button first (F7)")
+            return False
+        if not self.prepare():
+            return False
+
+        self.is_rolling = True
+        self.log("Started")
+        if threaded:
+            self.thread = threading.Thread(target=self.rolling_loop, daemon=True)
+            self.thread.start()
+        else:
+            self.rolling_loop()
+        return True
+
+    def stop(self):
+        """Ask the loop to stop - it logs "Stopped" when it exits"""
+        self.is_rolling = False
+
+    def rolling_loop(self):
+        """Main loop - FIXED: wait on the SAME pawn"""
+        from rimworld_capture import FrameChangeDetector
+
+        try:
+            delay = float(self.config["delay"]) / 1000
+        except ValueError:
+            delay = 0.025
+        log_ocr = bool(self.config.get("log_ocr"))
+        # Smallest crop that holds the traits at this resolution / UI scale - here, not in
+        # prepare(), so F9 never waits on the UI thread for a search (or for F7's one to finish)
+        if (self.region is None and not self.calibration_failed
+                and self.config.get("auto_calibrate") and self.live_capture()):
+            self.calibrate()
+        bbox = self.capture_bbox()
+        # Let the region grow when traits reach its edge (a pawn with more/longer traits)
+        refine = self.region is not None and self.live_capture()
+        if refine:
+            from rimworld_calibrate import touches_edge
+        metrics = self.metrics
+        record = metrics.record
+        clock = time.perf_counter
+
+        def grab():
+            t = clock()
+            gray = self.screen.grab(bbox)
+            record("grab", clock() - t)
+            return gray
+
+        # A click counts once the panel shows a different pawn; otherwise click again, waiting longer
+        click_timeout = float(self.config["click_timeout_ms"]) / 1000
+        click_retries = int(self.config["click_retries"])
+
+        # Closed-loop delay: bad clicks steer the pace, measured redraw time sets its floor
+        # and how soon a click with no redraw is retried
+        cadence = None
+        if self.config.get("adaptive_delay"):
+            from rimworld_cadence import CadenceController
+            cadence = self.cadence = CadenceController(delay, error_budget=float(self.config["error_budget"]))
+
+        # Starts OCR as soon as the panel redraws instead of a fixed sleep
+        detector = FrameChangeDetector()
+        frame = grab()
+        fresh = True
+        profiler = prof = None
+
+        while self.is_rolling:
+            try:
+                # Profiler toggled - (un)hook cProfile on this thread
+                if self.profiler is not profiler:
+                    if prof:
+                        profiler.leave_thread(prof)
+                    profiler, prof = self.profiler, None
+                    if profiler:
+                        prof = profiler.enter_thread()
+
+                start = clock()
+
+                # Check current pawn's traits - skip if the game never redrew
+                rule = None
+                if fresh:
+                    self.rolls += 1
+                    result = self.check_traits_optimized(bbox, frame)
+                    if refine and touches_edge(frame):
+                        # Grow and read this pawn again; stop trying once the search area is used up
+                        refine = self.calibrate(grow=True)
+                        if refine:
+                            bbox = self.capture_bbox()
+                            frame = grab()
+                            result = self.check_traits_optimized(bbox, frame)
+                    rule = self.report_roll(result, frame, log_ocr)
+                    record("check", clock() - start)
+                    metrics.roll()
+
+                if rule and rule.action == "stop":
+                    self.log("★★★ FOUND COMBO ★★★")
+                    self.is_rolling = False
+                    if self.on_hit:
+                        self.on_hit(rule)
+                    break
+                elif rule and rule.action == "pause" and self.pause_enabled:
+                    # Found a pause target - STOP HERE and wait
+                    self.log(f"Pausing {rule.pause:g}s on this pawn")
+                    self.log("Waiting for user to decide...")
+                    # Wait ON THIS PAWN
+                    t = clock()
+                    time.sleep(rule.pause)
+                    record("pause", clock() - t)
+                    # After waiting, continue to click to next pawn
+
+                # Replay sources run out
+                if getattr(self.screen, "exhausted", False):
+                    self.log("Replay finished")
+                    self.is_rolling = False
+                    break
+
+                # Click to next pawn and wait for the panel to change
+                detector.set_reference(frame)
+                wait = cadence.click_timeout(click_timeout) if cadence else click_timeout
+                errors = 0
+                for attempt in range(click_retries + 1):
+                    if attempt:
+                        metrics.count("click_retries")
+                    t = clock()
+                    self.input.click(self.button)
+                    t2 = clock()
+                    record("click", t2 - t)
+                    metrics.count("clicks")
+                    flickers = detector.flickers
+                    frame, fresh = detector.wait_for_change(grab, wait)
+                    redraw = clock() - t2
+                    record("wait", redraw)
+                    if detector.flickers != flickers:
+                        # Panel redrew but it's the same pawn - don't check it twice
+                        metrics.count("duplicates")
+                        errors += 1
+                    elif not fresh:
+                        errors += 1
+                    if fresh or not self.is_rolling or getattr(self.screen, "exhausted", False):
+                        break
+                    wait *= 2
+                else:
+                    metrics.count("dropped_clicks")
+                if cadence:
+                    delay = cadence.update(redraw if fresh else None, errors)
+                    metrics.gauge("cadence_ms", round(delay * 1000, 1))
+                    metrics.gauge("click_error_rate", round(cadence.error_rate, 4))
+                    metrics.gauge("click_timeout_ms", round(cadence.click_timeout(click_timeout) * 1000, 1))
+                t = clock()
+
+                # Wait remaining time
+                elapsed = t - start
+                if elapsed < delay:
+                    time.sleep(max(0, delay - elapsed))
+                    record("sleep", clock() - t)
+                record("roll", clock() - start)
+
+            except Exception as e:
+                self.log(f"Error: {e}")
+                time.sleep(0.1)
+
+        if prof:
+            profiler.leave_thread(prof)
+        if cadence:
+            c = cadence.snapshot()
+            redraw = f", redraw ~{c['redraw_ms']:.0f} ms" if c['redraw_ms'] is not None else ""
+            self.log(f"Auto delay settled at {c['interval_ms']:.0f} ms{redraw}, "
+                     f"{c['error_rate']:.1%} bad clicks, {c['backoffs']} backoffs")
+        self.log("Stopped")
+        self.save_trait_cache()
+        if self.calibration:
+            try:
+                self.calibration.save()
+            except Exception:
+                pass
+        self.export_metrics()
+        if self.on_stopped:
+            self.on_stopped()
+
+    def check_traits_optimized(self, bbox, gray=None):
+        """Recognize traits -> PanelResult (None if recognition failed)"""
+        try:
+            # Reuse the frame from the change detector when we have one
+            if gray is None:
+                gray = self.screen.grab(bbox)
+
+            result = self.pipeline.process(gray)
+            for stage, seconds in result.timings.items():
+                self.metrics.record(stage, seconds)
+            if self.frame_cache is not None:
+                self.metrics.gauge("frame_cache_hits", self.frame_cache.hits)
+                self.metrics.gauge("frame_cache_misses", self.frame_cache.misses)
+            return result
+
+        except:
+            return None
+
+    def report_roll(self, result, gray, log_ocr=False):
+        """History, event and log lines for one pawn (once, after any re-read) -> matched rule or None"""
+        if result is None:
+            return None
+        traits, mask, conf, rule = result.traits, result.mask, result.confidence, result.rule
+        ruleset = self.pipeline.ruleset
+
+        # A blank or failed read says nothing about the pawn - keep it out of the stats
+        if self.history and traits:
+            matcher = self.pipeline.matcher
+            self.history.record(self.rolls, [matcher.match(t)[0] or t for t in traits], rule,
+                                result.timings, gray)
+
+        if self.event:
+            self.event("roll", roll=self.rolls, traits=traits, rule=rule.name if rule else None,
+                       ms={k: round(v * 1000, 3) for k, v in result.timings.items()})
+
+        if log_ocr and traits:
+            self.log(f"OCR: {', '.join(traits)[:40]}")
+
+        # Log only when we find something
+        if rule:
+            # A rule made only of NOTs has no bits of its own - show what was read
+            found = ', '.join(ruleset.names(mask & rule.bits)) or ', '.join(traits)
+            if rule.name == "combo":
+                self.log(f"COMBO: {found}{format_confidence(conf)}")
+            elif rule.name == "partial":
+                self.log(f"Found MUST HAVE: {found}{format_confidence(conf)} (no second trait)")
+            else:
+                self.log(f"Rule '{rule.name}': {found}{format_confidence(conf)}")
+        return rule
+
+    def save_trait_cache(self):
+        """Persist learned trait images and recognized panels"""
+        if self.frame_cache is not None:
+            try:
+                self.frame_cache.save()
+                fc = self.frame_cache
+                self.log(f"Frame cache: {len(fc)} panels, {fc.hits} hits / {fc.misses} misses, {fc.evictions} evicted")
+            except Exception as e:
+                self.log(f"Frame cache save failed: {e}")
+        if self.trait_cache is None:
+            return
+        try:
+            self.trait_cache.save()
+            if self.pipeline:
+                recognizer = self.pipeline.recognizer
+                self.log(f"Trait cache: {len(self.trait_cache)} traits, {recognizer.hits} hits / {recognizer.misses} OCR")
+        except Exception as e:
+            self.log(f"Trait cache save failed: {e}")
+
+    def start_profiler(self, interval=0.005):
+        from rimworld_profiler import SamplingProfiler
+        if self.profiler:
+            return
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        self.profiler = profiler
+        self.log("Profiler started")
+
+    def stop_profiler(self):
+        """Stop profiling and write the report - returns the file paths (or None)"""
+        profiler, self.profiler = self.profiler, None
+        if not profiler:
+            return None
+        profiler.stop()
+        try:
+            paths = profiler.save()
+        except Exception as e:
+            self.log(f"Profile save failed: {e}")
+            return None
+        self.log(f"Profile ({profiler.samples} samples): {paths[0]}, {paths[1]}")
+        return paths
+
+    def toggle_profiler(self):
+        if self.profiler:
+            self.stop_profiler()
+        else:
+            self.start_profiler()
+
+    def export_metrics(self, path=None):
+        """Write a metrics snapshot to path (default: config "metrics_file", if set)"""
+        path = path or self.config.get("metrics_file")
+        if not path:
+            return
+        try:
+            self.metrics.export(path)
+            self.log(f"Metrics written to {path}")
+        except Exception as e:
+            self.log(f"Metrics export failed: {e}")
+
+    def close(self):
+        self.is_rolling = False
+        self.stop_profiler()
+        if self.history:
+            self.history.close()
+            self.history = None
+        if self.metrics_server:
+            self.metrics_server.close()
+            self.metrics_server = None
+        if self.pipeline:
+            self.pipeline.close()
+        if self.screen:
+            self.screen.close()
+        if self.ocr:
+            self.ocr.close()
+
+
+def format_confidence(conf):
+    """Only mention confidence for fuzzy matches"""
+    return "" if conf >= 1.0 else f" ({conf:.0%} match)"
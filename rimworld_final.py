@@ -6,20 +6,22 @@ RimWorld Trait Auto-Roller - FINAL VERSION
 - Looks for ONE trait from List A AND ONE trait from List B
 """
 
+import time
+_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import pyautogui
-import pytesseract
-from PIL import Image, ImageGrab
-import numpy as np
-import cv2
 import threading
-import time
 import keyboard
-import json
 import os
 import subprocess
-import queue
+from rimworld_logging import LogWriter
+from rimworld_uibus import UIBus, LogView
+from rimworld_seqview import SequenceView
+from rimworld_macro import ClickSequence, MACRO_FILE, JSON_FILE, WAIT_TYPES
+from rimworld_recorder import ClickRecorder, DRAIN_MS as RECORD_DRAIN_MS
+from rimworld_metrics import format_dashboard
+from rimworld_engine import RollEngine, load_config, save_config, load_pyautogui, peak_memory_mb, CONFIG_FILE
 
 class RimWorldAutoRoller:
     def __init__(self):
@@ -32,25 +34,32 @@ class RimWorldAutoRoller:
         self.root.attributes("-alpha", 0.95)
         
         # State
-        self.is_rolling = False
         self.random_btn_pos = None
         
-        # Async logging queue
-        self.log_queue = queue.Queue()
-        self.start_log_worker()
+        # Worker threads never touch Tk directly - they post to this bus
+        self.bus = UIBus(self.root)
         
-        # Setup Tesseract
-        try:
-            pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        except:
-            pass
+        # Async batched log writer (file + UI), settings from config
+        self.logger = LogWriter.from_config(load_config(), on_message=self.bus.log)
         
-        # Disable pyautogui safety features for speed
-        pyautogui.PAUSE = 0
-        pyautogui.FAILSAFE = False
+        # UI-free roll engine - OCR, capture and rules load on first start
+        self.engine = RollEngine(log=self.write_log)
+        self.engine.event = self.logger.event
+        self.engine.on_hit = self.on_combo
         
         self.create_ui()
+        self.bus.log_view = LogView(self.log)
+        self.bus.start()
+        self.refresh_metrics()
         self.register_hotkeys()
+        
+        startup_ms = (time.perf_counter() - _STARTED) * 1000
+        memory = peak_memory_mb()
+        self.write_log(f"Startup: {startup_ms:.0f} ms" + (f", {memory:.0f} MB" if memory else ""))
+    
+    @property
+    def is_rolling(self):
+        return self.engine.is_rolling
     
     def create_ui(self):
         # Main container with grid for resizing
@@ -134,10 +143,17 @@ class RimWorldAutoRoller:
         ttk.Label(speed_frame, text="Delay (ms):").pack(side="left")
         self.delay = tk.StringVar(value="25")  # 25ms = 40 clicks/sec
         ttk.Entry(speed_frame, textvariable=self.delay, width=8).pack(side="left", padx=5)
+        # Auto: start from Delay, then speed up / back off based on dropped clicks
+        self.auto_delay = tk.BooleanVar(value=False)
+        ttk.Checkbutton(speed_frame, text="Auto", variable=self.auto_delay).pack(side="left")
         # OCR logging checkbox
         self.log_ocr = tk.BooleanVar(value=False)
         ttk.Checkbutton(speed_frame, text="Log OCR", variable=self.log_ocr).pack(side="left", padx=10)
         
+        # Live roll stats (refreshed once a second from the engine's histograms)
+        self.metrics_label = ttk.Label(self.trait_tab, text="", font=("Courier", 8), justify="left")
+        self.metrics_label.grid(row=6, column=0, sticky="w")
+        
         # Log
         log_frame = ttk.Frame(self.trait_tab)
         log_frame.grid(row=7, column=0, sticky="nsew", pady=5)
@@ -154,9 +170,10 @@ class RimWorldAutoRoller:
         ttk.Button(btn_frame, text="Save Config", command=self.save_config).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Load Config", command=self.load_config).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Open Log", command=self.open_log).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Export Stats", command=self.export_metrics).pack(side="left", padx=5)
         
         # Instructions
-        ttk.Label(self.trait_tab, text="F7: Set button | F9: Start/Stop", foreground="blue", font=("Arial", 10, "bold")).grid(row=9, column=0, pady=10, sticky="w")
+        ttk.Label(self.trait_tab, text="F7: Set button | F9: Start/Stop | F8: Profile", foreground="blue", font=("Arial", 10, "bold")).grid(row=9, column=0, pady=10, sticky="w")
         
         # Load config on startup
         self.load_config()
@@ -164,9 +181,11 @@ class RimWorldAutoRoller:
     def create_autoclicker_tab(self):
         """Create the autoclicker tab UI"""
         # State for autoclicker
-        self.click_sequence = []
+        self.click_sequence = ClickSequence()
         self.is_recording = False
         self.is_playing = False
+        self.recorder = None
+        self.record_timing = tk.BooleanVar(value=False)
         
         # Configure grid for autoclicker tab
         self.autoclicker_tab.grid_rowconfigure(3, weight=1)  # Sequence list row
@@ -184,9 +203,13 @@ class RimWorldAutoRoller:
         control_frame.grid(row=2, column=0, pady=10, sticky="w")
         
         ttk.Button(control_frame, text="Insert Delay", command=self.insert_delay).pack(side="left", padx=2)
+        ttk.Button(control_frame, text="Insert Wait", command=self.insert_wait).pack(side="left", padx=2)
         ttk.Button(control_frame, text="Clear", command=self.clear_sequence).pack(side="left", padx=2)
         ttk.Button(control_frame, text="Save", command=self.save_sequence).pack(side="left", padx=2)
         ttk.Button(control_frame, text="Load", command=self.load_sequence).pack(side="left", padx=2)
+        ttk.Button(control_frame, text="Export JSON", command=self.export_sequence_json).pack(side="left", padx=2)
+        ttk.Button(control_frame, text="Import JSON", command=self.import_sequence_json).pack(side="left", padx=2)
+        ttk.Checkbutton(control_frame, text="Record timing", variable=self.record_timing).pack(side="left", padx=(10, 2))
         
         # Sequence list
         sequence_frame = ttk.Frame(self.autoclicker_tab)
@@ -202,13 +225,9 @@ class RimWorldAutoRoller:
         list_frame.grid_rowconfigure(0, weight=1)
         list_frame.grid_columnconfigure(0, weight=1)
         
-        self.sequence_listbox = tk.Listbox(list_frame, font=("Consolas", 9))
-        self.sequence_listbox.grid(row=0, column=0, sticky="nsew")
-        self.sequence_listbox.bind("<Double-Button-1>", self.edit_click_delay)
-        
-        sequence_scroll = ttk.Scrollbar(list_frame, orient="vertical", command=self.sequence_listbox.yview)
-        sequence_scroll.grid(row=0, column=1, sticky="ns")
-        self.sequence_listbox.config(yscrollcommand=sequence_scroll.set)
+        # Only the visible rows live in the listbox (macros can be 50k+ steps)
+        self.sequence_view = SequenceView(list_frame, self.click_sequence, font=("Consolas", 9))
+        self.sequence_view.bind("<Double-Button-1>", self.edit_click_delay)
         
         # Play options frame
         play_frame = ttk.Frame(self.autoclicker_tab)
@@ -229,20 +248,26 @@ class RimWorldAutoRoller:
                  foreground="blue", font=("Arial", 10, "bold")).grid(row=5, column=0, pady=10, sticky="w")
     
     def register_hotkeys(self):
-        keyboard.add_hotkey('f7', self.handle_f7)
-        keyboard.add_hotkey('f9', self.handle_f9)
-        keyboard.add_hotkey('f10', self.handle_f10)
-        keyboard.add_hotkey('f12', self.handle_f12)
+        # Hotkeys fire on the keyboard hook thread - handlers run on the Tk thread
+        keyboard.add_hotkey('f7', lambda: self.bus.post(self.handle_f7))
+        keyboard.add_hotkey('f9', lambda: self.bus.post(self.handle_f9))
+        keyboard.add_hotkey('f10', lambda: self.bus.post(self.handle_f10))
+        keyboard.add_hotkey('f12', lambda: self.bus.post(self.handle_f12))
         keyboard.add_hotkey('esc', self.emergency_stop)
+        # Profiler start/stop writes files - keep it off the Tk thread
+        keyboard.add_hotkey('f8', lambda: threading.Thread(target=self.engine.toggle_profiler, daemon=True).start())
     
     def emergency_stop(self):
-        """Emergency stop for recording/playback"""
+        """Emergency stop for recording/playback (flags drop at once, status follows)"""
         if self.is_recording:
             self.is_recording = False
-            self.autoclicker_status.config(text="Recording stopped (ESC)", foreground="red")
+            self.bus.set_state("autoclicker_status", self.set_autoclicker_status, "Recording stopped (ESC)", "red")
         if self.is_playing:
             self.is_playing = False
-            self.autoclicker_status.config(text="Playback stopped (ESC)", foreground="red")
+            self.bus.set_state("autoclicker_status", self.set_autoclicker_status, "Playback stopped (ESC)", "red")
+    
+    def set_autoclicker_status(self, text, color):
+        self.autoclicker_status.config(text=text, foreground=color)
     
     def handle_f7(self):
         """F7 handler - trait tab only"""
@@ -268,57 +293,50 @@ class RimWorldAutoRoller:
         if current_tab == 1:  # Autoclicker tab
             self.play_sequence()
     
-    def start_log_worker(self):
-        """Start async log worker thread"""
-        self.last_log_msg = ""  # Track last message to avoid duplicates
-        def worker():
-            while True:
-                try:
-                    msg = self.log_queue.get(timeout=0.1)
-                    if msg is None:
-                        break
-                    
-                    # Skip duplicate messages
-                    if msg == self.last_log_msg:
-                        continue
-                    self.last_log_msg = msg
-                    
-                    # Write to UI
-                    self.log.config(state='normal')
-                    self.log.insert(tk.END, f"{time.strftime('%H:%M:%S')} {msg}\n")
-                    self.log.see(tk.END)
-                    self.log.config(state='disabled')
-                    
-                    # Write to file
-                    with open("rimworld_log.txt", "a") as f:
-                        f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {msg}\n")
-                except:
-                    pass
-        
-        threading.Thread(target=worker, daemon=True).start()
+    def refresh_metrics(self):
+        """Update the stats line - reads the histograms, never waits on the roll thread"""
+        snap = self.engine.metrics.snapshot()
+        if snap["rolls"]:
+            text = format_dashboard(snap)
+            history = self.engine.history
+            expected = history.expected_rolls() if history else None
+            if expected:
+                text += f"\n~{expected:.0f} rolls per hit ({history.hits} hits in {history.total} rolls)"
+            self.metrics_label.config(text=text)
+        self.root.after(1000, self.refresh_metrics)
+    
+    def export_metrics(self):
+        self.engine.export_metrics(self.engine.config.get("metrics_file") or "rimworld_metrics.json")
     
     def write_log(self, msg):
         """Queue log message for async writing"""
-        self.log_queue.put(msg)
+        self.logger.write(msg)
     
     def set_button(self):
         """F7 - Set Random button position"""
+        pyautogui = load_pyautogui()
         self.random_btn_pos = pyautogui.position()
+        self.engine.set_button((self.random_btn_pos.x, self.random_btn_pos.y))
         self.status.config(text=f"Button at {self.random_btn_pos}", foreground="green")
         self.write_log(f"Button set: {self.random_btn_pos}")
         
-        # Show capture area
+        # Show capture area, then look for the real trait block (OCR - off the Tk thread)
+        self.engine.configure(self.gather_config())
         self.show_overlay()
+        threading.Thread(target=self.calibrate_region, daemon=True).start()
+    
+    def calibrate_region(self):
+        if self.engine.config.get("auto_calibrate") and self.engine.calibrate():
+            self.bus.post(self.show_overlay)
     
     def show_overlay(self):
         """Show where traits will be captured"""
         if not self.random_btn_pos:
             return
         
-        # TRAITS LOCATION: Measured from screenshots
-        x = self.random_btn_pos.x - 770  # To the "Traits" text
-        y = self.random_btn_pos.y + 280  # Down to trait names
-        w, h = 300, 100
+        # Calibrated trait block, or the default region scaled to this resolution
+        x0, y0, x1, y1 = self.engine.capture_bbox()
+        x, y, w, h = x0, y0, x1 - x0, y1 - y0
         
         # Create overlay
         overlay = tk.Toplevel()
@@ -343,133 +361,41 @@ class RimWorldAutoRoller:
             self.write_log("Set button first (F7)")
             return
         
-        self.is_rolling = True
+        self.engine.configure(self.gather_config())
+        if not self.engine.start():
+            return
         self.status.config(text="ROLLING... F9 to stop", foreground="orange")
-        self.write_log("Started")
-        
-        # Start thread
-        threading.Thread(target=self.rolling_loop, daemon=True).start()
     
     def stop(self):
-        self.is_rolling = False
+        self.engine.stop()
         self.status.config(text="Stopped", foreground="blue")
-        self.write_log("Stopped")
     
-    def rolling_loop(self):
-        """Main loop - FIXED: wait on the SAME pawn"""
-        delay = float(self.delay.get()) / 1000
-        
-        # Pre-compile lists for speed
-        list_a = [t.strip().lower().replace('-', ' ') for t in self.list_a.get("1.0", tk.END).strip().split('\n') if t.strip()]
-        list_b = [t.strip().lower().replace('-', ' ') for t in self.list_b.get("1.0", tk.END).strip().split('\n') if t.strip()]
-        
-        # Pre-calculate capture region
-        x = self.random_btn_pos.x - 770
-        y = self.random_btn_pos.y + 280
-        bbox = (x, y, x + 300, y + 100)
-        
-        while self.is_rolling:
-            try:
-                start = time.perf_counter()
-                
-                # Wait a bit for the game to update after click
-                time.sleep(0.1)
-                
-                # Check current pawn's traits
-                result = self.check_traits_optimized(bbox, list_a, list_b)
-                
-                if result == "combo":
-                    self.write_log("★★★ FOUND COMBO ★★★")
-                    pyautogui.alert("Found trait combo!", "SUCCESS")
-                    self.stop()
-                    break
-                elif result == "partial":
-                    # Found MUST HAVE trait - STOP HERE and wait
-                    self.write_log("Found MUST HAVE trait but no second trait - pausing 5s")
-                    self.write_log("Waiting for user to decide...")
-                    # Wait 5 seconds ON THIS PAWN
-                    time.sleep(5)
-                    # After waiting, continue to click to next pawn
-                
-                # Click to next pawn
-                pyautogui.click(self.random_btn_pos)
-                
-                # Wait remaining time
-                elapsed = time.perf_counter() - start
-                if elapsed < delay:
-                    time.sleep(max(0, delay - elapsed))
-                    
-            except Exception as e:
-                self.write_log(f"Error: {e}")
-                time.sleep(0.1)
+    def on_combo(self, rule):
+        """Engine found a stop rule (called from the roll thread - never blocks it)"""
+        self.bus.post(self.show_combo, rule)
     
-    def check_traits_optimized(self, bbox, list_a, list_b):
-        """Optimized OCR with working configuration"""
-        try:
-            # Direct screenshot with pre-calculated bbox
-            img = ImageGrab.grab(bbox=bbox)
-            
-            # Convert to grayscale for OCR
-            img_np = np.array(img)
-            gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
-            
-            # Simple threshold for better OCR
-            _, thresh = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY)
-            
-            # Working OCR config - PSM 6 for uniform text, default OEM
-            text = pytesseract.image_to_string(thresh, config='--psm 6')
-            
-            # Fast normalization
-            text_lower = text.lower().replace('-', ' ').replace('_', ' ')
-            
-            # Ultra-fast trait checking with early exit
-            found_a = None
-            found_b = None
-            
-            # Quick scan for MUST HAVE traits
-            for trait in list_a:
-                if trait in text_lower:
-                    found_a = trait
-                    break
-            
-            # If no primary trait and OCR logging enabled, log for debugging
-            if not found_a and self.log_ocr.get() and text.strip():
-                self.write_log(f"OCR: {' '.join(text.split())[:40]}")
-            
-            # Only check secondary if we found primary
-            if found_a:
-                for trait in list_b:
-                    if trait in text_lower:
-                        found_b = trait
-                        break
-                
-                # Log only when we find something
-                if found_b:
-                    if self.log_ocr.get():
-                        self.write_log(f"OCR: {' '.join(text.split())[:40]}")
-                    self.write_log(f"COMBO: {found_a} + {found_b}")
-                    return "combo"
-                else:
-                    if self.log_ocr.get():
-                        self.write_log(f"OCR: {' '.join(text.split())[:40]}")
-                    self.write_log(f"Found MUST HAVE: {found_a} (no second trait)")
-                    return "partial"
-            
-            return None
-            
-        except:
-            return None
+    def show_combo(self, rule):
+        self.stop()
+        messagebox.showinfo("SUCCESS", f"Found trait combo! ({rule.name})", parent=self.root)
     
-    def save_config(self):
-        """Save current configuration"""
-        config = {
+    def gather_config(self):
+        """Engine config + current widget values"""
+        config = dict(self.engine.config)
+        config.update({
             "list_a": self.list_a.get("1.0", tk.END).strip(),
             "list_b": self.list_b.get("1.0", tk.END).strip(),
-            "delay": self.delay.get()
-        }
+            "delay": self.delay.get(),
+            "adaptive_delay": self.auto_delay.get(),
+            "log_ocr": self.log_ocr.get()
+        })
+        return config
+    
+    def save_config(self):
+        """Save current configuration"""
+        config = self.gather_config()
+        config.pop("log_ocr", None)
         try:
-            with open("rimworld_config.json", "w") as f:
-                json.dump(config, f, indent=2)
+            save_config(config)
             self.write_log("Config saved")
             messagebox.showinfo("Success", "Configuration saved!")
         except Exception as e:
@@ -479,31 +405,34 @@ class RimWorldAutoRoller:
         """Open log file in Notepad++"""
         try:
             # Try Notepad++ first
-            subprocess.Popen(["notepad++", "rimworld_log.txt"], shell=True)
+            subprocess.Popen(["notepad++", self.logger.path], shell=True)
         except:
             try:
                 # Fallback to notepad
-                subprocess.Popen(["notepad", "rimworld_log.txt"], shell=True)
+                subprocess.Popen(["notepad", self.logger.path], shell=True)
             except Exception as e:
                 self.write_log(f"Could not open log: {e}")
     
     def load_config(self):
         """Load configuration if exists"""
-        if os.path.exists("rimworld_config.json"):
+        if os.path.exists(CONFIG_FILE):
             try:
-                with open("rimworld_config.json", "r") as f:
-                    config = json.load(f)
+                config = load_config()
                 
                 # Clear and set list A
                 self.list_a.delete("1.0", tk.END)
-                self.list_a.insert("1.0", config.get("list_a", "tough\niron willed\nindustrious"))
+                self.list_a.insert("1.0", config["list_a"])
                 
                 # Clear and set list B
                 self.list_b.delete("1.0", tk.END)
-                self.list_b.insert("1.0", config.get("list_b", ""))
+                self.list_b.insert("1.0", config["list_b"])
                 
                 # Set delay
-                self.delay.set(config.get("delay", "25"))
+                self.delay.set(config["delay"])
+                self.auto_delay.set(bool(config.get("adaptive_delay")))
+                
+                # Everything else (OCR, capture, rules...) lives in the engine
+                self.engine.configure(config)
                 
                 self.write_log("Config loaded")
             except Exception as e:
@@ -518,53 +447,54 @@ class RimWorldAutoRoller:
     
     def start_recording(self):
         """Start/continue recording clicks"""
-        if self.is_playing:
+        if self.is_playing or self.recorder is not None:
             return
         
         self.is_recording = True
         # Don't clear existing sequence - continue adding to it
-        self.update_sequence_display()
+        self.sequence_view.appended()
         
         if len(self.click_sequence) > 0:
             self.autoclicker_status.config(text=f"Continuing recording... {len(self.click_sequence)} clicks so far", foreground="red")
         else:
             self.autoclicker_status.config(text="Recording... Click anywhere, press F10 to stop", foreground="red")
         
-        # Start click listener thread
-        self.recording_thread = threading.Thread(target=self.click_listener, daemon=True)
-        self.recording_thread.start()
+        # The mouse hook only fills a ring buffer; the Tk loop drains it in batches
+        self.recorder = ClickRecorder(active=lambda: self.is_recording)
+        self.recorder.start()
+        self.root.after(RECORD_DRAIN_MS, self.drain_recording)
     
     def stop_recording(self):
         """Stop recording clicks"""
         self.is_recording = False
+        self.finish_recording()
         self.autoclicker_status.config(text=f"Recording stopped - {len(self.click_sequence)} clicks saved", foreground="blue")
-        self.update_sequence_display()
     
-    def click_listener(self):
-        """Listen for clicks while recording"""
-        import mouse
-        
-        def on_click(event):
-            if self.is_recording and hasattr(event, 'event_type') and event.event_type == mouse.DOWN:
-                pos = pyautogui.position()
-                button = 'left' if event.button == mouse.LEFT else 'right'
-                
-                self.click_sequence.append({
-                    'x': pos.x,
-                    'y': pos.y,
-                    'button': button,
-                    'type': 'click',
-                    'random_offset': 0  # Default no offset
-                })
-                self.root.after_idle(self.update_sequence_display)
-        
-        mouse.hook(on_click)
-        
-        # Keep thread alive while recording
-        while self.is_recording:
-            time.sleep(0.1)
-        
-        mouse.unhook_all()
+    def drain_recording(self):
+        """Move recorded clicks into the sequence (Tk thread)"""
+        if self.recorder is None:
+            return
+        steps = self.recorder.drain(self.record_timing.get())
+        if steps:
+            self.click_sequence.extend(steps)
+            self.sequence_view.appended()
+        if self.is_recording:
+            self.root.after(RECORD_DRAIN_MS, self.drain_recording)
+        else:
+            # Stopped from elsewhere (ESC)
+            self.finish_recording()
+    
+    def finish_recording(self):
+        recorder = self.recorder
+        if recorder is None:
+            return
+        self.recorder = None
+        recorder.stop()
+        steps = recorder.drain(self.record_timing.get())
+        if steps:
+            self.click_sequence.extend(steps)
+        self.sequence_view.appended()
+        self.write_log(recorder.summary())
     
     def play_sequence(self):
         """Play back the recorded click sequence"""
@@ -587,85 +517,69 @@ class RimWorldAutoRoller:
     def playback_worker(self, global_delay, repeats):
         """Worker thread for sequence playback"""
         import random
+        from rimworld_playback import ARM, DOWN, MOVE, WAIT, PlaybackScheduler, compile_sequence
+        from rimworld_waits import ScreenWaiter
+        pyautogui = load_pyautogui()
+        sequence = self.click_sequence.copy()
+        timeline = compile_sequence(sequence, global_delay)
+        target = [0, 0]
+        config = self.engine.config
+        # Own capture / OCR instances - the roller may be using its own at the same time
+        waiter = ScreenWaiter(config["capture_backend"], config["ocr_backend"], int(config["match_distance"]))
+
+        def fire(action, i):
+            item = sequence[i]
+            if action == WAIT:
+                self.bus.set_state("autoclicker_status", self.set_autoclicker_status,
+                                   f"Waiting - item {i+1}/{len(sequence)}", "orange")
+                met, _ = waiter.wait(item, lambda: self.is_playing)
+                return met
+            if action == ARM:
+                waiter.arm(item)
+                return
+            if action == MOVE:
+                # Apply per-click random offset if specified
+                x, y = item['x'], item['y']
+                click_offset = item.get('random_offset', 0)
+                if click_offset > 0:
+                    x += random.randint(-click_offset, click_offset)
+                    y += random.randint(-click_offset, click_offset)
+                target[:] = x, y
+                pyautogui.moveTo(x, y)
+            elif action == DOWN:
+                pyautogui.mouseDown(target[0], target[1], button=item['button'])
+            else:
+                pyautogui.mouseUp(target[0], target[1], button=item['button'])
+
+        def progress(rep, i):
+            self.bus.set_state("autoclicker_status", self.set_autoclicker_status,
+                               f"Playing {rep+1}/{repeats} - Item {i+1}/{len(sequence)}", "orange")
+
+        report = None
+        status = "Playback completed"
         try:
-            # Initial delay before starting
-            time.sleep(0.5)
-            
-            for repeat in range(repeats):
-                if not self.is_playing:
-                    break
-                
-                # Delay before each repeat (except first)
-                if repeat > 0:
-                    time.sleep(1.0)  # 1 second between repeats
-                
-                for i, item in enumerate(self.click_sequence):
-                    if not self.is_playing:
-                        break
-                    
-                    # Update status
-                    self.root.after_idle(lambda r=repeat+1, i=i+1: 
-                        self.autoclicker_status.config(text=f"Playing {r}/{repeats} - Item {i}/{len(self.click_sequence)}", foreground="orange"))
-                    
-                    if item['type'] == 'click':
-                        # Apply per-click random offset if specified
-                        x = item['x']
-                        y = item['y']
-                        click_offset = item.get('random_offset', 0)
-                        if click_offset > 0:
-                            x += random.randint(-click_offset, click_offset)
-                            y += random.randint(-click_offset, click_offset)
-                        
-                        # Move to position first, then click
-                        pyautogui.moveTo(x, y)
-                        time.sleep(0.02)  # Small pause after move
-                        
-                        if item['button'] == 'right':
-                            pyautogui.mouseDown(x, y, button='right')
-                            time.sleep(0.05)  # 50ms click duration
-                            pyautogui.mouseUp(x, y, button='right')
-                        else:
-                            pyautogui.mouseDown(x, y, button='left')
-                            time.sleep(0.05)  # 50ms click duration
-                            pyautogui.mouseUp(x, y, button='left')
-                    elif item['type'] == 'delay':
-                        # Custom delay
-                        time.sleep(item['delay_ms'] / 1000.0)
-                    
-                    # Always add delay between clicks (except after custom delays)
-                    if i < len(self.click_sequence) - 1:
-                        # Don't add delay if next item is a delay
-                        next_item = self.click_sequence[i + 1] if i + 1 < len(self.click_sequence) else None
-                        if not next_item or next_item['type'] != 'delay':
-                            time.sleep(global_delay)
-                
-        
+            report = PlaybackScheduler(timeline, repeats).run(fire, lambda: self.is_playing, progress)
+            self.write_log(report.format())
+            s = report.summary()
+            status = f"Playback completed - late p95 {s['late_p95_ms']:.1f} ms, max {s['late_max_ms']:.1f} ms"
+            if report.timed_out is not None:
+                status = f"Wait step {report.timed_out + 1} timed out - playback stopped"
+                self.write_log(status)
         finally:
             self.is_playing = False
-            self.root.after_idle(lambda: self.autoclicker_status.config(text="Playback completed", foreground="green"))
-    
-    def update_sequence_display(self):
-        """Update the sequence listbox"""
-        self.sequence_listbox.delete(0, tk.END)
-        
-        for i, item in enumerate(self.click_sequence):
-            if item['type'] == 'click':
-                button_name = "Left" if item['button'] == 'left' else "Right"
-                offset = item.get('random_offset', 0)
-                if offset > 0:
-                    self.sequence_listbox.insert(tk.END, f"{i+1:3d}. {button_name} click at ({item['x']}, {item['y']}) [±{offset}px]")
-                else:
-                    self.sequence_listbox.insert(tk.END, f"{i+1:3d}. {button_name} click at ({item['x']}, {item['y']})")
-            elif item['type'] == 'delay':
-                self.sequence_listbox.insert(tk.END, f"{i+1:3d}. DELAY {item['delay_ms']}ms")
+            waiter.close()
+            # ESC already put up its own status
+            if report is None or not report.stopped or report.timed_out is not None:
+                color = "red" if report is not None and report.timed_out is not None else "green"
+                self.bus.set_state("autoclicker_status", self.set_autoclicker_status, status, color)
     
     def clear_sequence(self):
         """Clear the recorded sequence"""
         if self.is_recording or self.is_playing:
             return
         
-        self.click_sequence = []
-        self.update_sequence_display()
+        self.click_sequence = ClickSequence()
+        self.sequence_view.set_items(self.click_sequence)
         self.autoclicker_status.config(text="Sequence cleared", foreground="blue")
     
     def save_sequence(self):
@@ -675,49 +589,64 @@ class RimWorldAutoRoller:
             return
         
         try:
-            with open("click_sequence.json", "w") as f:
-                json.dump(self.click_sequence, f, indent=2)
+            self.click_sequence.save(MACRO_FILE)
             messagebox.showinfo("Success", "Sequence saved!")
             self.autoclicker_status.config(text="Sequence saved", foreground="green")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save: {e}")
     
     def load_sequence(self):
-        """Load click sequence from file"""
+        """Load click sequence from file (older JSON saves are still read)"""
         if self.is_recording or self.is_playing:
             return
         
         try:
-            if os.path.exists("click_sequence.json"):
-                with open("click_sequence.json", "r") as f:
-                    loaded_sequence = json.load(f)
-                
-                # Ensure backwards compatibility - convert old format to new
-                for i, item in enumerate(loaded_sequence):
-                    if 'type' not in item:
-                        # Old format - convert to click item
-                        item['type'] = 'click'
-                        # Remove any old delay_ms fields as we now use separate delay items
-                        if 'delay_ms' in item:
-                            del item['delay_ms']
-                
-                self.click_sequence = loaded_sequence
-                self.update_sequence_display()
-                self.autoclicker_status.config(text=f"Sequence loaded - {len(self.click_sequence)} items", foreground="green")
+            if os.path.exists(MACRO_FILE):
+                self.set_sequence(ClickSequence.load(MACRO_FILE), "loaded")
+            elif os.path.exists(JSON_FILE):
+                self.set_sequence(ClickSequence.from_json(JSON_FILE), "loaded")
             else:
                 messagebox.showwarning("Warning", "No saved sequence found")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load: {e}")
     
+    def export_sequence_json(self):
+        """Write the sequence as click_sequence.json"""
+        if not self.click_sequence:
+            messagebox.showwarning("Warning", "No sequence to export")
+            return
+        try:
+            self.click_sequence.to_json(JSON_FILE)
+            self.autoclicker_status.config(text=f"Sequence exported to {JSON_FILE}", foreground="green")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export: {e}")
+    
+    def import_sequence_json(self):
+        """Read click_sequence.json"""
+        if self.is_recording or self.is_playing:
+            return
+        try:
+            if os.path.exists(JSON_FILE):
+                self.set_sequence(ClickSequence.from_json(JSON_FILE), "imported")
+            else:
+                messagebox.showwarning("Warning", f"{JSON_FILE} not found")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import: {e}")
+    
+    def set_sequence(self, sequence, verb):
+        self.click_sequence = sequence
+        self.sequence_view.set_items(self.click_sequence)
+        self.autoclicker_status.config(text=f"Sequence {verb} - {len(self.click_sequence)} items", foreground="green")
+    
     def insert_delay(self):
         """Insert a delay at selected position"""
         if self.is_recording or self.is_playing:
             return
         
         # Get insertion position
-        selection = self.sequence_listbox.curselection()
-        if selection:
-            insert_pos = selection[0] + 1  # Insert after selected item
+        selection = self.sequence_view.selection()
+        if selection is not None:
+            insert_pos = selection + 1  # Insert after selected item
         else:
             insert_pos = len(self.click_sequence)  # Insert at end
         
@@ -752,7 +681,7 @@ class RimWorldAutoRoller:
                 }
                 
                 self.click_sequence.insert(insert_pos, delay_item)
-                self.update_sequence_display()
+                self.sequence_view.inserted(insert_pos)
                 dialog.destroy()
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid number")
@@ -767,22 +696,103 @@ class RimWorldAutoRoller:
         
         entry.bind("<Return>", lambda e: insert())
     
+    def insert_wait(self):
+        """Insert a screen-condition wait after the selected item"""
+        if self.is_recording or self.is_playing:
+            return
+        selection = self.sequence_view.selection()
+        self.wait_dialog(selection + 1 if selection is not None else len(self.click_sequence))
+    
+    def wait_dialog(self, index, item=None):
+        """Create (item=None, inserted at index) or edit a wait step"""
+        editing = item is not None
+        if not editing:
+            pos = load_pyautogui().position()
+            item = {'type': 'wait_change', 'x': pos.x, 'y': pos.y, 'w': 100, 'h': 30, 'timeout_ms': 5000}
+        kinds = {"Region changes": 'wait_change', "Color appears": 'wait_pixel', "Text appears": 'wait_text'}
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Edit Wait" if editing else "Insert Wait")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        form = ttk.Frame(dialog, padding=10)
+        form.pack(fill="both", expand=True)
+        kind_var = tk.StringVar(value=next(k for k, v in kinds.items() if v == item['type']))
+        ttk.Label(form, text="Wait until:").grid(row=0, column=0, sticky="w")
+        ttk.Combobox(form, textvariable=kind_var, values=list(kinds), state="readonly", width=18).grid(
+            row=0, column=1, columnspan=3, sticky="w", pady=2)
+        
+        fields = {}
+        rows = [("x", "X"), ("y", "Y"), ("w", "Width"), ("h", "Height"), ("timeout_ms", "Timeout (ms)"),
+                ("color", "Color (#rrggbb)"), ("tolerance", "Tolerance"), ("text", "Text")]
+        defaults = {'color': "#ffffff", 'tolerance': 10, 'text': ""}
+        for row, (key, label) in enumerate(rows, start=1):
+            ttk.Label(form, text=label + ":").grid(row=row, column=0, sticky="w")
+            fields[key] = tk.StringVar(value=str(item.get(key, defaults.get(key, ""))))
+            ttk.Entry(form, textvariable=fields[key], width=20).grid(row=row, column=1, columnspan=3, sticky="w", pady=1)
+        ttk.Label(form, text="Color: any pixel in the region. Text: read with OCR.", foreground="gray").grid(
+            row=len(rows) + 1, column=0, columnspan=4, sticky="w", pady=(5, 0))
+        
+        def save():
+            kind = kinds[kind_var.get()]
+            try:
+                step = {'type': kind, 'x': int(fields['x'].get()), 'y': int(fields['y'].get()),
+                        'w': int(fields['w'].get()), 'h': int(fields['h'].get()),
+                        'timeout_ms': int(fields['timeout_ms'].get())}
+                if kind == 'wait_pixel':
+                    step['color'] = fields['color'].get().strip()
+                    step['tolerance'] = int(fields['tolerance'].get())
+                elif kind == 'wait_text':
+                    step['text'] = fields['text'].get().strip()
+                    if not step['text']:
+                        messagebox.showwarning("Warning", "Enter the text to wait for")
+                        return
+                if not 1 <= step['w'] <= 4096 or not 1 <= step['h'] <= 4096:
+                    messagebox.showwarning("Warning", "Width and height must be 1-4096 px")
+                    return
+                if not 50 <= step['timeout_ms'] <= 600000:
+                    messagebox.showwarning("Warning", "Timeout must be 50-600000ms")
+                    return
+                if editing:
+                    self.click_sequence[index] = step
+                    self.sequence_view.changed(index)
+                else:
+                    self.click_sequence.insert(index, step)
+                    self.sequence_view.inserted(index)
+                dialog.destroy()
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid value: {e}")
+        
+        def delete():
+            self.click_sequence.pop(index)
+            self.sequence_view.deleted(index)
+            dialog.destroy()
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Save", command=save).pack(side="left", padx=5)
+        if editing:
+            ttk.Button(button_frame, text="Delete", command=delete).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side="left", padx=5)
+    
     def edit_click_delay(self, event):
         """Edit delay or click item"""
         if self.is_recording or self.is_playing:
             return
         
-        selection = self.sequence_listbox.curselection()
-        if not selection:
+        index = self.sequence_view.selection()
+        if index is None:
             return
         
-        index = selection[0]
         if index >= len(self.click_sequence):
             return
         
         item = self.click_sequence[index]
         
-        if item['type'] == 'delay':
+        if item['type'] in WAIT_TYPES:
+            self.wait_dialog(index, item)
+        elif item['type'] == 'delay':
             # Edit existing delay
             current_delay = item['delay_ms']
             
@@ -810,15 +820,15 @@ class RimWorldAutoRoller:
                         messagebox.showwarning("Warning", "Maximum delay is 30000ms")
                         return
                     
-                    self.click_sequence[index]['delay_ms'] = new_delay
-                    self.update_sequence_display()
+                    self.click_sequence[index] = dict(item, delay_ms=new_delay)
+                    self.sequence_view.changed(index)
                     dialog.destroy()
                 except ValueError:
                     messagebox.showerror("Error", "Please enter a valid number")
             
             def delete_delay():
                 self.click_sequence.pop(index)
-                self.update_sequence_display()
+                self.sequence_view.deleted(index)
                 dialog.destroy()
             
             def cancel():
@@ -862,21 +872,21 @@ class RimWorldAutoRoller:
                         messagebox.showwarning("Warning", "Maximum offset is 50px")
                         return
                     
-                    self.click_sequence[index]['random_offset'] = new_offset
-                    self.update_sequence_display()
+                    self.click_sequence[index] = dict(item, random_offset=new_offset)
+                    self.sequence_view.changed(index)
                     dialog.destroy()
                 except ValueError:
                     messagebox.showerror("Error", "Please enter a valid number")
             
             def delete_click():
                 self.click_sequence.pop(index)
-                self.update_sequence_display()
+                self.sequence_view.deleted(index)
                 dialog.destroy()
             
             def insert_delay_after():
                 dialog.destroy()
                 # Select this item and call insert_delay
-                self.sequence_listbox.selection_set(index)
+                self.sequence_view.select(index)
                 self.insert_delay()
             
             def cancel():
@@ -891,6 +901,9 @@ class RimWorldAutoRoller:
     
     def run(self):
         self.root.mainloop()
+        self.bus.stop()
+        self.engine.close()
+        self.logger.close()
 
 if __name__ == "__main__":
     app = RimWorldAutoRoller()
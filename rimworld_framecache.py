@@ -0,0 +1,95 @@
+"""
+Whole-panel recognition cache
+- Keyed by a hash of the binarized panel, so a pawn whose panel renders the same
+  as one already seen skips segmentation, the cell dictionary and OCR
+- Bounded by entry count (each entry is one key + a few short strings);
+  "lru" evicts the least recently hit panel, "fifo" the oldest one
+- Only panels where every cell was read and resolved to a known trait are cached
+  (a worker failure or an unreadable cell never pins a panel)
+- Persisted between sessions, in recency order
+"""
+
+import collections
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FRAME_CACHE_FILE = "frame_cache.json"
+POLICIES = ("lru", "fifo")
+
+
+class FrameCache:
+    def __init__(self, path=FRAME_CACHE_FILE, max_entries=4096, policy="lru"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown frame cache policy: {policy} (use {', '.join(POLICIES)})")
+        self.path = path
+        self.max_entries = max_entries
+        self.policy = policy
+        self.entries = collections.OrderedDict()  # key -> trait list, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(binary):
+        h = hashlib.blake2b(binary.tobytes(), digest_size=16)
+        h.update(np.int32(binary.shape).tobytes())
+        return h.hexdigest()
+
+    def get(self, key):
+        """Cached trait list for this panel, or None"""
+        traits = self.entries.get(key)
+        if traits is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == "lru":
+            self.entries.move_to_end(key)
+        return list(traits)
+
+    def put(self, key, traits):
+        if self.max_entries <= 0:
+            return
+        traits = tuple(traits)
+        if self.entries.get(key) == traits:
+            return
+        self.entries[key] = traits
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.dirty = True
+
+    def clear(self):
+        self.entries.clear()
+        self.dirty = True
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hits / total if total else 0.0}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        self.entries = collections.OrderedDict((k, tuple(v)) for k, v in data.get("entries", []))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.dirty = False
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {"policy": self.policy, "entries": [[k, list(v)] for k, v in self.entries.items()]}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
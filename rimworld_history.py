@@ -0,0 +1,244 @@
+"""
+Roll history - every pawn's traits in a local SQLite database
+- record() only queues; a background thread inserts in batches
+- Traits are indexed for frequency / co-occurrence queries
+- Distinct trait combos are counted in memory, so the hit rate of the current
+  rules (and the expected rolls still to go) updates in O(1) per roll
+"""
+
+import collections
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+HISTORY_FILE = "rimworld_history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    rules TEXT
+);
+CREATE TABLE IF NOT EXISTS rolls (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL REFERENCES sessions(id),
+    ts REAL NOT NULL,
+    roll INTEGER NOT NULL,
+    traits TEXT NOT NULL,
+    rule TEXT,
+    hit INTEGER NOT NULL DEFAULT 0,
+    frame_hash TEXT,
+    ms TEXT
+);
+CREATE TABLE IF NOT EXISTS roll_traits (
+    roll_id INTEGER NOT NULL REFERENCES rolls(id),
+    trait TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS roll_traits_trait ON roll_traits(trait, roll_id);
+CREATE INDEX IF NOT EXISTS roll_traits_roll ON roll_traits(roll_id);
+CREATE INDEX IF NOT EXISTS rolls_traits ON rolls(traits);
+CREATE INDEX IF NOT EXISTS rolls_session ON rolls(session, hit);
+"""
+
+
+def frame_hash(gray):
+    return hashlib.blake2b(gray.tobytes(), digest_size=8).hexdigest()
+
+
+def expected_rolls(total, hits):
+    """1 / hit rate, with the rate estimated as (hits + 1) / (total + 2) so zero hits still gives a number"""
+    return (total + 2) / (hits + 1)
+
+
+def combo_key(traits):
+    """Trait list -> canonical "a|b|c" key (sorted, no duplicates)"""
+    return "|".join(sorted(set(traits)))
+
+
+class RollHistory:
+    def __init__(self, path=HISTORY_FILE, batch=256, flush_interval=1.0):
+        self.path = path
+        self.batch = batch                    # Rows per transaction
+        self.flush_interval = flush_interval  # Seconds a roll may wait in memory
+        self.dropped = 0
+        self.queue = queue.SimpleQueue()
+
+        # In-memory counts for the live estimate
+        self.combos = collections.Counter()  # combo key -> rolls
+        self.total = 0
+        self.ruleset = None
+        self.hit_combos = {}  # combo key -> is a stop hit under self.ruleset
+        self.hits = 0
+
+        db = self._connect()
+        try:
+            for key, n in db.execute("SELECT traits, COUNT(*) FROM rolls GROUP BY traits"):
+                self.combos[key] = n
+                self.total += n
+        finally:
+            db.close()
+        self.session = None
+        self.thread = threading.Thread(target=self._worker, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        return db
+
+    # Live estimate
+
+    def set_rules(self, ruleset):
+        """New rule set - re-evaluate every distinct combo seen so far"""
+        self.ruleset = ruleset
+        self.hit_combos = {}
+        self.hits = sum(n for key, n in self.combos.items() if self._is_hit(key))
+        self.queue.put(("session", time.time(), json.dumps([[r.name, r.text, r.action] for r in ruleset.rules])))
+
+    def _is_hit(self, key):
+        hit = self.hit_combos.get(key)
+        if hit is None:
+            rule = self.ruleset.evaluate(self.ruleset.mask(key.split("|") if key else ()))
+            hit = self.hit_combos[key] = bool(rule and rule.action == "stop")
+        return hit
+
+    def expected_rolls(self):
+        """Expected rolls until the next stop hit, None before any history"""
+        if not self.total or self.ruleset is None:
+            return None
+        return expected_rolls(self.total, self.hits)
+
+    def record(self, roll, traits, rule=None, timings=None, gray=None):
+        """Queue one roll (traits = canonical names, rule = matched Rule or None)"""
+        key = combo_key(traits)
+        self.combos[key] += 1
+        self.total += 1
+        if self.ruleset is not None and self._is_hit(key):
+            self.hits += 1
+        self.queue.put(("roll", time.time(), roll, key, rule.name if rule else None,
+                        int(bool(rule and rule.action == "stop")),
+                        frame_hash(gray) if gray is not None else None, timings))
+
+    def close(self, timeout=5.0):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    # Writer thread
+
+    def _worker(self):
+        db = None
+        rows = []
+        deadline = None
+        running = True
+        while running:
+            try:
+                item = self.queue.get(timeout=self.flush_interval if deadline is None else
+                                      max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                running = False
+            elif item:
+                if db is None:
+                    db = self._connect()
+                if item[0] == "session":
+                    # Pending rolls belong to the previous session
+                    self._flush(db, rows)
+                    rows = []
+                    cur = db.execute("INSERT INTO sessions (started, rules) VALUES (?, ?)", item[1:])
+                    db.commit()
+                    self.session = cur.lastrowid
+                else:
+                    rows.append(item[1:])
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+            if rows and (not running or len(rows) >= self.batch or time.monotonic() >= deadline):
+                self._flush(db, rows)
+                rows, deadline = [], None
+            elif not rows:
+                deadline = None
+
+        if db is not None:
+            db.close()
+
+    def _flush(self, db, rows):
+        if not rows:
+            return
+        try:
+            with db:
+                for ts, roll, key, rule, hit, fhash, timings in rows:
+                    ms = json.dumps({k: round(v * 1000, 3) for k, v in timings.items()}) if timings else None
+                    cur = db.execute(
+                        "INSERT INTO rolls (session, ts, roll, traits, rule, hit, frame_hash, ms) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.session or 0, ts, roll, key, rule, hit, fhash, ms))
+                    if key:
+                        db.executemany("INSERT INTO roll_traits (roll_id, trait) VALUES (?, ?)",
+                                       [(cur.lastrowid, t) for t in key.split("|")])
+        except sqlite3.Error:
+            self.dropped += len(rows)
+
+
+# Queries (read-only, on their own connection)
+
+def open_history(path=HISTORY_FILE):
+    db = sqlite3.connect(path)
+    db.executescript(_SCHEMA)
+    return db
+
+
+def total_rolls(db):
+    return db.execute("SELECT COUNT(*) FROM rolls").fetchone()[0]
+
+
+def trait_frequencies(db, limit=None):
+    """[(trait, rolls with it, share of all rolls)] most common first"""
+    total = total_rolls(db) or 1
+    sql = "SELECT trait, COUNT(*) AS n FROM roll_traits GROUP BY trait ORDER BY n DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [(t, n, n / total) for t, n in db.execute(sql)]
+
+
+def co_occurrence(db, trait=None, limit=20):
+    """[(trait a, trait b, rolls with both)] - all pairs, or the partners of one trait"""
+    if trait:
+        where, args = "a.trait != b.trait WHERE a.trait = ?", (trait,)
+    else:
+        where, args = "a.trait < b.trait", ()
+    sql = ("SELECT a.trait, b.trait, COUNT(*) AS n FROM roll_traits a "
+           f"JOIN roll_traits b ON a.roll_id = b.roll_id AND {where} "
+           "GROUP BY a.trait, b.trait ORDER BY n DESC LIMIT ?")
+    return list(db.execute(sql, args + (int(limit),)))
+
+
+def rolls_to_hit(db):
+    """[(session, started, rolls, hit)] - rolls up to the first stop hit, or all rolls if none"""
+    out = []
+    for sid, started in db.execute("SELECT id, started FROM sessions ORDER BY id").fetchall():
+        first = db.execute("SELECT MIN(id) FROM rolls WHERE session = ? AND hit = 1", (sid,)).fetchone()[0]
+        if first is None:
+            n = db.execute("SELECT COUNT(*) FROM rolls WHERE session = ?", (sid,)).fetchone()[0]
+        else:
+            n = db.execute("SELECT COUNT(*) FROM rolls WHERE session = ? AND id <= ?", (sid, first)).fetchone()[0]
+        if n:
+            out.append((sid, started, n, first is not None))
+    return out
+
+
+def estimate_for_rules(db, ruleset):
+    """(rolls, stop hits, expected rolls to the next hit) for a rule set over the whole history"""
+    total = hits = 0
+    for key, n in db.execute("SELECT traits, COUNT(*) FROM rolls GROUP BY traits"):
+        total += n
+        rule = ruleset.evaluate(ruleset.mask(key.split("|") if key else ()))
+        if rule and rule.action == "stop":
+            hits += n
+    return total, hits, expected_rolls(total, hits)
@@ -0,0 +1,140 @@
+"""
+Log writer for the trait roller
+- write() only queues; a background thread batches messages to disk
+- One open file handle, flushed on batch size or time, rotated by size
+- Optional JSON Lines output with structured events (roll ids, timings)
+- Never blocks or raises into the caller
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+LOG_FILE = "rimworld_log.txt"
+
+
+class LogWriter:
+    def __init__(self, path=LOG_FILE, max_bytes=5 * 1024 * 1024, backups=3, jsonl=False,
+                 flush_interval=0.5, flush_bytes=16 * 1024, on_message=None, dedupe=True):
+        self.path = path
+        self.jsonl_path = os.path.splitext(path)[0] + ".jsonl" if jsonl else None
+        self.max_bytes = max_bytes            # Rotate when a file grows past this (0 = never)
+        self.backups = backups                # Keep path.1 .. path.N
+        self.flush_interval = flush_interval  # Seconds a message may sit in memory
+        self.flush_bytes = flush_bytes        # Or flush once this much text is pending
+        self.on_message = on_message          # Callback(ts, msg) for plain messages, e.g. the UI
+        self.dedupe = dedupe                  # Skip a message identical to the previous one
+        self.dropped = 0                      # Messages lost to disk errors
+        self.queue = queue.SimpleQueue()
+        self.files = {}
+        self.last_msg = None
+        self.thread = threading.Thread(target=self._worker, name="log-writer", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        return cls(path=config.get("log_file", LOG_FILE),
+                   max_bytes=int(config.get("log_max_kb", 5 * 1024)) * 1024,
+                   backups=int(config.get("log_backups", 3)),
+                   jsonl=bool(config.get("log_jsonl", False)), **kwargs)
+
+    def write(self, msg, **fields):
+        """Queue a log line (extra fields only go to JSON Lines)"""
+        self.queue.put((time.time(), msg, fields))
+
+    def event(self, kind, **fields):
+        """Structured record for JSON Lines only (no text log, no UI)"""
+        if self.jsonl_path:
+            self.queue.put((time.time(), None, dict(fields, event=kind)))
+
+    def close(self, timeout=2.0):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def _worker(self):
+        text = []
+        records = []
+        pending = 0
+        deadline = None
+        running = True
+        while running:
+            try:
+                item = self.queue.get(timeout=self.flush_interval if deadline is None else
+                                      max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                running = False
+            elif item:
+                ts, msg, fields = item
+                if msg is not None:
+                    if self.dedupe and msg == self.last_msg:
+                        continue
+                    self.last_msg = msg
+                    line = f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))} {msg}\n"
+                    text.append(line)
+                    pending += len(line)
+                    if self.on_message:
+                        try:
+                            self.on_message(ts, msg)
+                        except Exception:
+                            pass
+                if self.jsonl_path:
+                    record = {"ts": round(ts, 3)}
+                    if msg is not None:
+                        record["msg"] = msg
+                    record.update(fields)
+                    line = json.dumps(record, default=str) + "\n"
+                    records.append(line)
+                    pending += len(line)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            # Flush on size, on time, or when closing
+            if pending and (not running or pending >= self.flush_bytes or time.monotonic() >= deadline):
+                self._flush(self.path, text)
+                if records:
+                    self._flush(self.jsonl_path, records)
+                text, records, pending, deadline = [], [], 0, None
+            elif not pending:
+                deadline = None
+
+        for f in self.files.values():
+            try:
+                f.close()
+            except Exception:
+                pass
+
+    def _flush(self, path, lines):
+        try:
+            f = self.files.get(path)
+            if f is None:
+                f = self.files[path] = open(path, "a", encoding="utf-8")
+            f.write("".join(lines))
+            f.flush()
+            if self.max_bytes and f.tell() >= self.max_bytes:
+                self._rotate(path)
+        except Exception:
+            self.dropped += len(lines)
+            # Reopen next time
+            f = self.files.pop(path, None)
+            if f:
+                try:
+                    f.close()
+                except Exception:
+                    pass
+
+    def _rotate(self, path):
+        """path -> path.1 -> path.2 ... keeping self.backups files"""
+        self.files.pop(path).close()
+        if self.backups <= 0:
+            os.remove(path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
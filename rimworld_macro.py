@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Autoclicker macros as fixed-width binary records
+- In memory: one bytearray of 24-byte records instead of a dict per step;
+  items are unpacked to the usual dicts on access
+- On disk (.rwm): small versioned header, the wait-step strings, then the same
+  records, so a file can be read in one call, memory-mapped, or streamed
+- JSON import/export matches click_sequence.json (legacy entries fixed on import)
+- Version 1 files (16-byte records, clicks and delays only) still load
+
+    python rimworld_macro.py convert click_sequence.json click_sequence.rwm
+    python rimworld_macro.py bench --steps 50000
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+
+MACRO_FILE = "click_sequence.rwm"
+JSON_FILE = "click_sequence.json"
+
+MAGIC = b"RWMACRO\x00"
+VERSION = 2
+HEADER_V1 = struct.Struct("<8sHHI")   # magic, version, record size, record count
+HEADER = struct.Struct("<8sHHII")     # ... + string table bytes
+# type, button / tolerance, random_offset, x, y, delay / timeout ms, w, h, color / text id
+RECORD = struct.Struct("<BBHiiIHHI")
+RECORD_V1 = struct.Struct("<BBHiiI")
+_STRING_LEN = struct.Struct("<H")
+
+TYPES = ("click", "delay", "wait_change", "wait_pixel", "wait_text")
+WAIT_TYPES = TYPES[2:]
+BUTTONS = ("left", "right", "middle")
+_TYPE_CODES = {name: i for i, name in enumerate(TYPES)}
+_BUTTON_CODES = {name: i for i, name in enumerate(BUTTONS)}
+
+
+class MacroFormatError(ValueError):
+    pass
+
+
+def legacy_item(item):
+    """Old JSON entries have no type and carried their own delay_ms - they are plain clicks"""
+    if 'type' not in item:
+        item = {k: v for k, v in item.items() if k != 'delay_ms'}
+        item['type'] = 'click'
+    return item
+
+
+def unpack_record(texts, code, button, offset, x, y, delay_ms, w, h, value):
+    """Record fields -> step dict (same keys and order as the JSON format)"""
+    if code == 0:
+        return {'x': x, 'y': y, 'button': BUTTONS[button], 'type': 'click', 'random_offset': offset}
+    if code == 1:
+        return {'type': 'delay', 'delay_ms': delay_ms}
+    if code == 2:
+        return {'type': 'wait_change', 'x': x, 'y': y, 'w': w, 'h': h, 'timeout_ms': delay_ms}
+    if code == 3:
+        return {'type': 'wait_pixel', 'x': x, 'y': y, 'w': w, 'h': h, 'color': f"#{value:06x}",
+                'tolerance': button, 'timeout_ms': delay_ms}
+    return {'type': 'wait_text', 'x': x, 'y': y, 'w': w, 'h': h, 'text': texts[value], 'timeout_ms': delay_ms}
+
+
+class ClickSequence:
+    """List of step dicts stored as packed records (+ a table of wait-step strings)"""
+
+    def __init__(self, items=()):
+        self.data = bytearray()
+        self.texts = []
+        self._text_ids = {}
+        self._map = None
+        self.extend(items)
+
+    def __len__(self):
+        return len(self.data) // RECORD.size
+
+    def _offset(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("sequence index out of range")
+        return index * RECORD.size
+
+    def _text_id(self, text):
+        i = self._text_ids.get(text)
+        if i is None:
+            i = self._text_ids[text] = len(self.texts)
+            self.texts.append(text)
+        return i
+
+    def pack(self, item):
+        """Step dict -> record bytes"""
+        kind = item.get('type', 'click')
+        try:
+            code = _TYPE_CODES[kind]
+            if kind == 'click':
+                return RECORD.pack(code, _BUTTON_CODES[item.get('button', 'left')], item.get('random_offset', 0),
+                                   item['x'], item['y'], 0, 0, 0, 0)
+            if kind == 'delay':
+                return RECORD.pack(code, 0, 0, 0, 0, item['delay_ms'], 0, 0, 0)
+            if kind == 'wait_pixel':
+                value, tolerance = int(item['color'].lstrip('#'), 16), item.get('tolerance', 0)
+            elif kind == 'wait_text':
+                value, tolerance = self._text_id(str(item['text'])), 0
+            else:
+                value, tolerance = 0, 0
+            return RECORD.pack(code, tolerance, 0, item['x'], item['y'], item['timeout_ms'],
+                               item.get('w', 1), item.get('h', 1), value)
+        except (KeyError, ValueError, struct.error) as e:
+            raise MacroFormatError(f"Bad {kind} step {item!r}: {e}")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return unpack_record(self.texts, *RECORD.unpack_from(self.data, self._offset(index)))
+
+    def __setitem__(self, index, item):
+        o = self._offset(index)
+        self.data[o:o + RECORD.size] = self.pack(item)
+
+    def __delitem__(self, index):
+        o = self._offset(index)
+        del self.data[o:o + RECORD.size]
+
+    def __iter__(self):
+        texts = self.texts
+        for fields in RECORD.iter_unpack(self.data):
+            yield unpack_record(texts, *fields)
+
+    def __bool__(self):
+        return len(self.data) > 0
+
+    def append(self, item):
+        self.data += self.pack(item)
+
+    def extend(self, items):
+        if isinstance(items, ClickSequence):
+            if items.texts:
+                items = list(items)  # Text ids differ between sequences
+            else:
+                self.data += items.data
+                return
+        self.data += b"".join(self.pack(item) for item in items)
+
+    def insert(self, index, item):
+        n = len(self)
+        index = max(0, min(n, index + n if index < 0 else index))
+        o = index * RECORD.size
+        self.data[o:o] = self.pack(item)
+
+    def pop(self, index=-1):
+        item = self[index]
+        del self[index]
+        return item
+
+    def clear(self):
+        del self.data[:]
+        self.texts = []
+        self._text_ids = {}
+
+    def copy(self):
+        seq = ClickSequence()
+        seq.data = bytearray(self.data)
+        seq.texts = list(self.texts)
+        seq._text_ids = dict(self._text_ids)
+        return seq
+
+    def to_list(self):
+        return list(self)
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+    # Binary files
+
+    def _compact_texts(self):
+        """Strings still referenced (edits/deletes leave old ones behind) -> (records, strings)"""
+        if not self.texts:
+            return self.data, []
+        code = _TYPE_CODES['wait_text']
+        used = {}
+        data = bytearray(self.data)
+        for i, fields in enumerate(RECORD.iter_unpack(self.data)):
+            if fields[0] == code:
+                new = used.setdefault(fields[-1], len(used))
+                struct.pack_into("<I", data, i * RECORD.size + RECORD.size - 4, new)
+        texts = [None] * len(used)
+        for old, new in used.items():
+            texts[new] = self.texts[old]
+        return data, texts
+
+    def save(self, path=MACRO_FILE):
+        data, texts = self._compact_texts()
+        table = _pack_strings(texts)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(self), len(table)))
+            f.write(table)
+            f.write(data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=MACRO_FILE):
+        """Whole file into memory (one read)"""
+        with open(path, "rb") as f:
+            version, count, texts = _read_header(f, path)
+            size = RECORD_V1.size if version == 1 else RECORD.size
+            raw = f.read(count * size)
+        if len(raw) != count * size:
+            raise MacroFormatError(f"{path}: truncated ({len(raw) // size} of {count} records)")
+        seq = cls()
+        if version == 1:
+            pad = bytes(RECORD.size - RECORD_V1.size)
+            seq.data = bytearray(b"".join(raw[o:o + size] + pad for o in range(0, len(raw), size)))
+        else:
+            seq.data = bytearray(raw)
+        seq.texts = texts
+        seq._text_ids = {t: i for i, t in enumerate(texts)}
+        return seq
+
+    @classmethod
+    def mapped(cls, path=MACRO_FILE):
+        """Read-only sequence backed by a memory map of the file (no copy, no load time)"""
+        with open(path, "rb") as f:
+            version, count, texts = _read_header(f, path)
+            start = f.tell()
+            if version == 1:
+                return cls.load(path)  # Old records have to be widened anyway
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = start + count * RECORD.size
+        if len(mm) < end:
+            mm.close()
+            raise MacroFormatError(f"{path}: truncated")
+        seq = cls()
+        seq._map = mm
+        seq.data = memoryview(mm)[start:end]
+        seq.texts = texts
+        return seq
+
+    def close(self):
+        """Release the memory map of a mapped() sequence"""
+        if self._map is not None:
+            self.data.release()
+            self.data = bytearray()
+            self._map.close()
+            self._map = None
+
+    # JSON
+
+    def to_json(self, path=JSON_FILE):
+        with open(path, "w") as f:
+            json.dump(self.to_list(), f, indent=2)
+
+    @classmethod
+    def from_json(cls, path=JSON_FILE):
+        with open(path, "r") as f:
+            return cls(legacy_item(item) for item in json.load(f))
+
+
+def _pack_strings(texts):
+    out = bytearray()
+    for text in texts:
+        raw = text.encode("utf-8")
+        out += _STRING_LEN.pack(len(raw)) + raw
+    return bytes(out)
+
+
+def _unpack_strings(raw):
+    texts = []
+    o = 0
+    while o < len(raw):
+        n, = _STRING_LEN.unpack_from(raw, o)
+        o += _STRING_LEN.size
+        texts.append(raw[o:o + n].decode("utf-8"))
+        o += n
+    return texts
+
+
+def _read_header(f, path):
+    """-> (version, record count, strings), f left at the first record"""
+    raw = f.read(HEADER_V1.size)
+    if len(raw) < HEADER_V1.size:
+        raise MacroFormatError(f"{path}: not a macro file")
+    magic, version, size, count = HEADER_V1.unpack(raw)
+    if magic != MAGIC:
+        raise MacroFormatError(f"{path}: not a macro file")
+    if version == 1 and size == RECORD_V1.size:
+        return version, count, []
+    if version != VERSION or size != RECORD.size:
+        raise MacroFormatError(f"{path}: format version {version} not supported (this is {VERSION})")
+    table_bytes, = struct.unpack("<I", f.read(4))
+    table = f.read(table_bytes)
+    if len(table) != table_bytes:
+        raise MacroFormatError(f"{path}: truncated")
+    return version, count, _unpack_strings(table)
+
+
+def stream(path=MACRO_FILE, chunk=4096):
+    """Yield step dicts from a .rwm file, chunk records at a time"""
+    with open(path, "rb") as f:
+        version, count, texts = _read_header(f, path)
+        size = RECORD_V1.size if version == 1 else RECORD.size
+        pad = (0, 0, 0) if version == 1 else ()
+        rec = RECORD_V1 if version == 1 else RECORD
+        while count > 0:
+            buf = f.read(min(count, chunk) * size)
+            buf = buf[:len(buf) - len(buf) % size]
+            if not buf:
+                raise MacroFormatError(f"{path}: truncated")
+            for fields in rec.iter_unpack(buf):
+                yield unpack_record(texts, *(fields + pad))
+            count -= len(buf) // size
+
+
+def load_any(path):
+    """.json or .rwm by extension"""
+    if path.lower().endswith(".json"):
+        return ClickSequence.from_json(path)
+    return ClickSequence.load(path)
+
+
+def save_any(seq, path):
+    if path.lower().endswith(".json"):
+        seq.to_json(path)
+    else:
+        seq.save(path)
+
+
+# Benchmark against the JSON format
+
+def synthetic_macro(steps):
+    import random
+    rng = random.Random(1)
+    items = []
+    for i in range(steps):
+        if i % 10 == 9:
+            items.append({'type': 'delay', 'delay_ms': rng.randint(50, 3000)})
+        else:
+            items.append({'x': rng.randint(0, 3839), 'y': rng.randint(0, 2159), 'button': rng.choice(BUTTONS[:2]),
+                          'type': 'click', 'random_offset': rng.choice((0, 0, 0, 5))})
+    return items
+
+
+def _measure(fn):
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def bench(steps, directory="."):
+    items = synthetic_macro(steps)
+    json_path = os.path.join(directory, "bench_macro.json")
+    rwm_path = os.path.join(directory, "bench_macro.rwm")
+
+    seq = ClickSequence(items)
+
+    def save_json():
+        with open(json_path, "w") as f:
+            json.dump(items, f, indent=2)
+
+    _, t_json_save, _ = _measure(save_json)
+    _, t_rwm_save, _ = _measure(lambda: seq.save(rwm_path))
+
+    def load_json():
+        with open(json_path, "r") as f:
+            return [legacy_item(item) for item in json.load(f)]
+
+    loaded, t_json, m_json = _measure(load_json)
+    mapped, t_map, m_map = _measure(lambda: ClickSequence.mapped(rwm_path))
+    binary, t_rwm, m_rwm = _measure(lambda: ClickSequence.load(rwm_path))
+    _, t_stream, _ = _measure(lambda: sum(1 for _ in stream(rwm_path)))
+    _, t_import, _ = _measure(lambda: ClickSequence.from_json(json_path))
+    assert binary.to_list() == loaded == mapped.to_list()
+    mapped.close()
+
+    rows = [("json (dict per step)", os.path.getsize(json_path), t_json_save, t_json, m_json),
+            ("rwm load", os.path.getsize(rwm_path), t_rwm_save, t_rwm, m_rwm),
+            ("rwm mmap", os.path.getsize(rwm_path), None, t_map, m_map)]
+    print(f"{steps} steps")
+    print(f"{'format':<22}{'file KB':>10}{'save ms':>10}{'load ms':>10}{'memory KB':>12}")
+    for name, size, save, load, mem in rows:
+        save = f"{save * 1000:10.1f}" if save is not None else f"{'-':>10}"
+        print(f"{name:<22}{size / 1024:10.1f}{save}{load * 1000:10.1f}{mem / 1024:12.1f}")
+    print(f"rwm stream (all steps as dicts): {t_stream * 1000:.1f} ms, json -> rwm import: {t_import * 1000:.1f} ms")
+    os.remove(json_path)
+    os.remove(rwm_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Autoclicker macro files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Convert between .json and .rwm (by extension)")
+    convert.add_argument("source")
+    convert.add_argument("dest")
+    b = sub.add_parser("bench", help="Compare size / load time / memory of JSON and binary macros")
+    b.add_argument("--steps", type=int, default=50000)
+    b.add_argument("--dir", default=".", help="Where to write the temporary files")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        seq = load_any(args.source)
+        save_any(seq, args.dest)
+        print(f"{len(seq)} steps: {args.source} -> {args.dest}")
+    else:
+        bench(args.steps, args.dir)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
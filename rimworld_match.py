@@ -0,0 +1,85 @@
+"""
+Trait matcher - maps an OCR line to the closest canonical trait
+- Exact dict hit for clean reads
+- Deletion-variant table (symspell style) for misreads like "tougb" / "nimbie"
+- Results are memoized, so repeated lines cost one dict lookup
+"""
+
+from itertools import combinations
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, stops early once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+def deletes(word, distance):
+    """All strings reachable from word by removing up to distance chars"""
+    out = {word}
+    for n in range(1, min(distance, len(word)) + 1):
+        for idx in combinations(range(len(word)), n):
+            out.add("".join(c for i, c in enumerate(word) if i not in idx))
+    return out
+
+
+class TraitMatcher:
+    """Compiled once per run from the normalized trait vocabulary"""
+
+    def __init__(self, traits, max_distance=2, memo_size=4096):
+        self.max_distance = max_distance
+        self.memo_size = memo_size
+        self.traits = set(t for t in traits if t)
+        self.variants = {}
+        self.memo = {}
+        for trait in self.traits:
+            for variant in deletes(trait, self.allowed(trait)):
+                self.variants.setdefault(variant, set()).add(trait)
+
+    def allowed(self, trait):
+        """Short names get less tolerance ("gay" must be exact)"""
+        return min(self.max_distance, len(trait) // 4)
+
+    def match(self, text):
+        """Return (trait, confidence 0-1) or (None, 0.0)"""
+        if text in self.traits:
+            return text, 1.0
+        hit = self.memo.get(text)
+        if hit is None:
+            hit = self._lookup(text)
+            if len(self.memo) >= self.memo_size:
+                self.memo.clear()
+            self.memo[text] = hit
+        return hit
+
+    def _lookup(self, text):
+        if not text or not self.max_distance:
+            return None, 0.0
+        candidates = set()
+        for variant in deletes(text, self.max_distance):
+            candidates |= self.variants.get(variant, set())
+
+        best, best_dist, tie = None, None, False
+        for trait in candidates:
+            limit = self.allowed(trait)
+            dist = edit_distance(text, trait, limit)
+            if dist > limit:
+                continue
+            if best_dist is None or dist < best_dist:
+                best, best_dist, tie = trait, dist, False
+            elif dist == best_dist:
+                tie = True
+
+        # Two traits equally close - don't guess
+        if best is None or tie:
+            return None, 0.0
+        return best, 1.0 - best_dist / max(len(best), len(text))
@@ -0,0 +1,208 @@
+"""
+Roll metrics - where the time goes in each roll
+- Fixed log-spaced histograms: recording is one log2 + one list increment
+- Rolls/sec over a sliding window, p50/p95/p99 per stage
+- Snapshots as JSON (file) or from a local HTTP endpoint (JSON + Prometheus text)
+"""
+
+import collections
+import json
+import math
+import os
+import threading
+import time
+
+# Stages timed by the roll engine, in roll order
+ROLL_STAGES = ("grab", "threshold", "recognize", "match", "check", "click", "wait", "sleep", "pause", "roll")
+
+_BUCKETS_PER_OCTAVE = 4   # ~19% bucket width
+_MIN_SECONDS = 1e-6       # Bucket 0 holds everything below 1us
+_NUM_BUCKETS = 4 * 24     # Up to ~16s
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (seconds in, milliseconds out)"""
+
+    def __init__(self):
+        self.counts = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds > _MIN_SECONDS:
+            i = min(_NUM_BUCKETS - 1, int(math.log2(seconds / _MIN_SECONDS) * _BUCKETS_PER_OCTAVE))
+        else:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @staticmethod
+    def bucket_upper(i):
+        """Upper edge of bucket i in seconds"""
+        return _MIN_SECONDS * 2 ** ((i + 1) / _BUCKETS_PER_OCTAVE)
+
+    def percentile(self, p):
+        """Approximate p-th percentile in seconds (bucket upper edge, capped at max)"""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.bucket_upper(i), self.max)
+        return self.max
+
+    def summary(self):
+        return {"count": self.count,
+                "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                "p50_ms": round(self.percentile(50) * 1000, 3),
+                "p95_ms": round(self.percentile(95) * 1000, 3),
+                "p99_ms": round(self.percentile(99) * 1000, 3),
+                "max_ms": round(self.max * 1000, 3)}
+
+
+class RollMetrics:
+    """Per-stage histograms + roll rate, written by the roll thread, read by anyone"""
+
+    def __init__(self, stages=ROLL_STAGES, window=10.0):
+        self.stages = {name: LatencyHistogram() for name in stages}
+        self.window = window  # Seconds of history for rolls/sec
+        self.roll_times = collections.deque()
+        self.rolls = 0
+        self.counters = collections.Counter()  # e.g. clicks, click_retries, duplicates
+        self.gauges = {}                       # Latest values, e.g. cadence_ms
+        self.started = time.time()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def record(self, stage, seconds):
+        hist = self.stages.get(stage)
+        if hist is None:
+            hist = self.stages[stage] = LatencyHistogram()
+        hist.record(seconds)
+
+    def roll(self):
+        """One pawn done"""
+        now = time.perf_counter()
+        self.rolls += 1
+        self.roll_times.append(now)
+        while self.roll_times[0] < now - self.window:
+            self.roll_times.popleft()
+
+    def rolls_per_sec(self):
+        times = list(self.roll_times)
+        if len(times) < 2:
+            return 0.0
+        # Measured up to now so the rate drops when rolling stops
+        span = max(time.perf_counter(), times[-1]) - times[0]
+        return (len(times) - 1) / span if span > 0 else 0.0
+
+    def reset(self):
+        for name in list(self.stages):
+            self.stages[name] = LatencyHistogram()
+        self.roll_times.clear()
+        self.rolls = 0
+        self.counters.clear()
+        self.gauges.clear()
+        self.started = time.time()
+
+    def snapshot(self):
+        return {"ts": round(time.time(), 3),
+                "since": round(self.started, 3),
+                "rolls": self.rolls,
+                "rolls_per_sec": round(self.rolls_per_sec(), 2),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "stages": {name: h.summary() for name, h in list(self.stages.items()) if h.count}}
+
+    def export(self, path):
+        """Write a JSON snapshot (atomic replace)"""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+    def prometheus(self):
+        """Snapshot in Prometheus text format"""
+        snap = self.snapshot()
+        lines = ["# TYPE rimworld_rolls_total counter", f"rimworld_rolls_total {snap['rolls']}",
+                 "# TYPE rimworld_rolls_per_second gauge", f"rimworld_rolls_per_second {snap['rolls_per_sec']}",
+                 "# TYPE rimworld_events_total counter"]
+        for name, n in snap["counters"].items():
+            lines.append(f'rimworld_events_total{{event="{name}"}} {n}')
+        lines.append("# TYPE rimworld_gauge gauge")
+        for name, v in snap["gauges"].items():
+            lines.append(f'rimworld_gauge{{name="{name}"}} {v}')
+        lines.append("# TYPE rimworld_stage_ms summary")
+        for name, s in snap["stages"].items():
+            for q in ("50", "95", "99"):
+                lines.append(f'rimworld_stage_ms{{stage="{name}",quantile="0.{q}"}} {s["p" + q + "_ms"]}')
+            lines.append(f'rimworld_stage_ms_count{{stage="{name}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def format_dashboard(snapshot, stages=("grab", "recognize", "click", "wait", "roll")):
+    """Short text for the UI - rolls/sec plus p50/p95/p99 per stage"""
+    lines = [f"{snapshot['rolls']} rolls, {snapshot['rolls_per_sec']:.1f} rolls/s   (ms p50/p95/p99)"]
+    gauges = snapshot.get("gauges", {})
+    if "cadence_ms" in gauges:
+        lines.append(f"cadence {gauges['cadence_ms']:.0f} ms (auto), {gauges.get('click_error_rate', 0):.1%} bad clicks, "
+                     f"re-click after {gauges.get('click_timeout_ms', 0):.0f} ms")
+    if "frame_cache_hits" in gauges:
+        hits, misses = gauges["frame_cache_hits"], gauges.get("frame_cache_misses", 0)
+        lines.append(f"frame cache {hits}/{hits + misses} panels ({hits / max(1, hits + misses):.0%}) skipped OCR")
+    counters = snapshot.get("counters", {})
+    if counters.get("click_retries") or counters.get("duplicates"):
+        lines.append(f"{counters.get('click_retries', 0)} click retries, {counters.get('duplicates', 0)} duplicate pawns, "
+                     f"{counters.get('dropped_clicks', 0)} dropped")
+    for name in stages:
+        s = snapshot["stages"].get(name)
+        if s:
+            lines.append(f"{name:<10}{s['p50_ms']:7.1f}{s['p95_ms']:7.1f}{s['p99_ms']:7.1f}")
+    return "\n".join(lines)
+
+
+class MetricsServer:
+    """Local HTTP endpoint: /metrics (Prometheus text), /metrics.json"""
+
+    def __init__(self, metrics, port=9464, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json") or self.path == "/":
+                    body = json.dumps(metrics.snapshot(), indent=2).encode()
+                    ctype = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = metrics.prometheus().encode()
+                    ctype = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
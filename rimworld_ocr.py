@@ -0,0 +1,106 @@
+"""
+OCR backends for the trait roller
+- tesserocr: Tesseract API bound in-process, model loaded once and reused
+- pytesseract: spawns tesseract.exe per image (fallback, always available)
+"""
+
+import threading
+
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+TESSDATA_DIRS = [r'C:\Program Files\Tesseract-OCR\tessdata']
+
+OCR_BACKENDS = ("auto", "tesserocr", "pytesseract")
+
+
+class OCRBackend:
+    """Base class - turns a grayscale/binary numpy image into text"""
+    name = "base"
+
+    def image_to_string(self, img, psm=6):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Fallback - one tesseract process per call"""
+    name = "pytesseract"
+
+    def __init__(self, tesseract_cmd=TESSERACT_CMD):
+        import pytesseract
+        self.pytesseract = pytesseract
+        try:
+            import os
+            if tesseract_cmd and os.path.exists(tesseract_cmd):
+                pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        except:
+            pass
+
+    def image_to_string(self, img, psm=6):
+        return self.pytesseract.image_to_string(img, config=f'--psm {psm}')
+
+
+class TesserocrBackend(OCRBackend):
+    """Persistent engine - the language model stays loaded between rolls"""
+    name = "tesserocr"
+
+    def __init__(self, lang="eng"):
+        import tesserocr
+        from PIL import Image
+        self.tesserocr = tesserocr
+        self.Image = Image
+        self.lang = lang
+        self.path = self._find_tessdata()
+        # One API per thread and psm - the API itself is not thread safe
+        self.local = threading.local()
+        self.all_apis = []
+        self.lock = threading.Lock()
+        self._get_api(6)
+
+    def _find_tessdata(self):
+        import os
+        for path in TESSDATA_DIRS:
+            if os.path.isdir(path):
+                return path
+        return None
+
+    def _get_api(self, psm):
+        apis = getattr(self.local, "apis", None)
+        if apis is None:
+            apis = self.local.apis = {}
+        api = apis.get(psm)
+        if api is None:
+            kwargs = {"lang": self.lang, "psm": psm}
+            if self.path:
+                kwargs["path"] = self.path
+            api = self.tesserocr.PyTessBaseAPI(**kwargs)
+            apis[psm] = api
+            with self.lock:
+                self.all_apis.append(api)
+        return api
+
+    def image_to_string(self, img, psm=6):
+        api = self._get_api(psm)
+        api.SetImage(self.Image.fromarray(img))
+        return api.GetUTF8Text()
+
+    def close(self):
+        with self.lock:
+            for api in self.all_apis:
+                try:
+                    api.End()
+                except:
+                    pass
+            self.all_apis = []
+        self.local = threading.local()
+
+
+def create_ocr_backend(name="auto", tesseract_cmd=TESSERACT_CMD):
+    """Build the configured backend, falling back to pytesseract"""
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend()
+        except Exception:
+            pass
+    return PytesseractBackend(tesseract_cmd)
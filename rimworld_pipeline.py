@@ -0,0 +1,99 @@
+"""
+Trait panel pipeline - no UI, no screen, no mouse
+- grayscale panel -> threshold -> [frame cache] -> recognizer -> fuzzy matcher -> rules
+- Shared by the Tk roller and the offline benchmark
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from rimworld_match import TraitMatcher
+from rimworld_recognizer import TraitRecognizer, KNOWN_TRAITS
+
+# Pipeline stages, in order, as reported in timings
+STAGES = ("threshold", "recognize", "match")
+
+
+class PanelResult:
+    """What the pipeline saw on one panel"""
+    __slots__ = ("traits", "mask", "confidence", "rule", "timings")
+
+    def __init__(self, traits, mask, confidence, rule, timings):
+        self.traits = traits          # Raw recognized strings
+        self.mask = mask              # Trait bits known to the rule set
+        self.confidence = confidence  # Lowest match confidence among those bits
+        self.rule = rule              # First matching rule or None
+        self.timings = timings        # {stage: seconds}
+
+
+def match_traits(traits, matcher, vocab, unread=0):
+    """Resolve each line to its canonical trait, then all rules are a few int ops
+    -> (mask, lowest confidence, every cell read and resolved to a known trait)"""
+    mask = 0
+    conf = 1.0
+    resolved = not unread
+    for text in traits:
+        trait, c = matcher.match(text)
+        if trait is None:
+            resolved = False
+        bit = vocab.get(trait, 0)
+        if bit:
+            mask |= bit
+            conf = min(conf, c)
+    return mask, conf, resolved
+
+
+class TraitPipeline:
+    def __init__(self, recognizer, ruleset, matcher, threshold=180, frame_cache=None):
+        self.recognizer = recognizer
+        self.ruleset = ruleset
+        self.matcher = matcher
+        self.threshold = threshold
+        self.frame_cache = frame_cache  # Optional FrameCache - repeat panels skip recognition
+        self._binary = None
+        recognizer.matcher = matcher
+
+    @classmethod
+    def build(cls, ocr, ruleset, dictionary=None, match_distance=2, workers=1, frame_cache=None):
+        recognizer = TraitRecognizer(ocr, dictionary, workers=workers)
+        matcher = TraitMatcher(set(ruleset.traits) | KNOWN_TRAITS, max_distance=match_distance)
+        return cls(recognizer, ruleset, matcher, frame_cache=frame_cache)
+
+    def process(self, gray):
+        """Grayscale panel -> PanelResult"""
+        t0 = time.perf_counter()
+        # Binarize into a reused buffer instead of allocating one per roll
+        if self._binary is None or self._binary.shape != gray.shape:
+            self._binary = np.empty_like(gray)
+        cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY, dst=self._binary)
+        thresh = self._binary
+        t1 = time.perf_counter()
+
+        # Seen this exact panel before? Otherwise known trait images skip OCR,
+        # unseen lines go to Tesseract
+        cache = self.frame_cache
+        key = traits = None
+        if cache is not None:
+            key = cache.key(thresh)
+            traits = cache.get(key)
+        cached = traits is not None
+        unread = 0
+        if not cached:
+            traits = self.recognizer.recognize(thresh)
+            unread = self.recognizer.unread
+        t2 = time.perf_counter()
+
+        mask, conf, resolved = match_traits(traits, self.matcher, self.ruleset.vocab, unread)
+        # Unread / unknown cells: a NOT rule might be excluding exactly that trait
+        rule = self.ruleset.evaluate(mask, resolved) if traits else None
+        if key is not None and not cached and resolved:
+            cache.put(key, traits)
+        t3 = time.perf_counter()
+
+        return PanelResult(traits, mask, conf, rule,
+                           {"threshold": t1 - t0, "recognize": t2 - t1, "match": t3 - t2})
+
+    def close(self):
+        self.recognizer.close()
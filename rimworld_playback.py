@@ -0,0 +1,216 @@
+"""
+Macro playback on absolute deadlines
+- A sequence is compiled once into a timeline: (offset from pass start, action, item)
+  for a single pass; repeats replay the same timeline shifted by the pass length
+- Every action waits for its own deadline measured from the run start, so a late
+  step is not carried into the next one and long repeats don't drift
+- Waits sleep until just before the deadline, then spin the last stretch
+- Wait steps (rimworld_waits.py) take as long as the screen needs; everything after
+  a wait is timed from the moment it finished
+- A wait_change right after a click gets an ARM entry just before that click is
+  pressed, so "click, then wait for the region to change" compares against the
+  screen as it was before the click
+- Lateness of every action goes into a histogram for the after-run report
+"""
+
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+
+from rimworld_macro import WAIT_TYPES
+from rimworld_metrics import LatencyHistogram
+
+MOVE, DOWN, UP, WAIT, ARM = 0, 1, 2, 3, 4
+
+NO_GAP_BEFORE = ('delay',) + WAIT_TYPES
+MOVE_SETTLE = 0.02  # Pause between moving onto a target and pressing
+HOLD = 0.05         # Button held down this long
+START_DELAY = 0.5   # Before the first action
+REPEAT_GAP = 1.0    # Between passes
+SPIN = 0.002        # Busy-wait this close to a deadline (sleep is too coarse)
+MAX_SLEEP = 0.05    # Longest single sleep, so a stop is noticed during long delays
+
+
+class Timeline:
+    """One pass of a sequence as parallel arrays, sorted by time"""
+
+    def __init__(self):
+        self.times = array("d")    # Seconds from pass start
+        self.actions = array("B")  # MOVE / DOWN / UP / WAIT / ARM
+        self.items = array("I")    # Index into the sequence
+        self.duration = 0.0        # Pass length without waits (next pass starts after this + the repeat gap)
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, t, action, item):
+        self.times.append(t)
+        self.actions.append(action)
+        self.items.append(item)
+
+    def insert(self, index, t, action, item):
+        self.times.insert(index, t)
+        self.actions.insert(index, action)
+        self.items.insert(index, item)
+
+
+def compile_sequence(sequence, global_delay, move_settle=MOVE_SETTLE, hold=HOLD):
+    """Click/delay items -> Timeline (same gaps as the old sleep chain, as deadlines)"""
+    timeline = Timeline()
+    t = 0.0
+    last = len(sequence) - 1
+    arm = None  # (timeline index, time) right after the last click's MOVE, if no wait since
+    for i, item in enumerate(sequence):
+        if item['type'] == 'click':
+            timeline.add(t, MOVE, i)
+            arm = (len(timeline), t)
+            t += move_settle
+            timeline.add(t, DOWN, i)
+            t += hold
+            timeline.add(t, UP, i)
+        elif item['type'] == 'delay':
+            t += item['delay_ms'] / 1000.0
+        elif item['type'] in WAIT_TYPES:
+            # Takes no planned time - later deadlines move by however long it took
+            if item['type'] == 'wait_change' and arm is not None:
+                # Reference frame before the click that should change the region
+                timeline.insert(arm[0], arm[1], ARM, i)
+            timeline.add(t, WAIT, i)
+            arm = None
+        # Global delay between items, unless a delay step sets the gap itself (on either
+        # side - recorded timing must play back as recorded) or the next item is a wait
+        if i < last and item['type'] != 'delay' and sequence[i + 1]['type'] not in NO_GAP_BEFORE:
+            t += global_delay
+    timeline.duration = t
+    return timeline
+
+
+@contextmanager
+def timer_resolution(ms=1):
+    """Ask Windows for 1 ms timer ticks while playing (default is ~15.6 ms)"""
+    winmm = None
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            winmm = ctypes.windll.winmm
+            winmm.timeBeginPeriod(ms)
+        except Exception:
+            winmm = None
+    try:
+        yield
+    finally:
+        if winmm is not None:
+            winmm.timeEndPeriod(ms)
+
+
+class PlaybackReport:
+    def __init__(self):
+        self.lateness = LatencyHistogram()  # Actual minus planned time per action
+        self.actions = 0
+        self.planned = 0.0  # Planned run length (s)
+        self.actual = 0.0
+        self.passes = 0
+        self.stopped = False
+        self.waits = 0
+        self.waited = 0.0        # Seconds later deadlines were pushed back by waits
+        self.timed_out = None    # Sequence index of a wait that timed out (not one cut short by a stop)
+
+    def summary(self):
+        s = self.lateness.summary()
+        return {"actions": self.actions, "passes": self.passes, "stopped": self.stopped,
+                "planned_s": round(self.planned, 3), "actual_s": round(self.actual, 3),
+                "drift_ms": round((self.actual - self.planned - self.waited) * 1000, 1),
+                "waits": self.waits, "waited_s": round(self.waited, 3),
+                "late_p50_ms": s["p50_ms"], "late_p95_ms": s["p95_ms"],
+                "late_p99_ms": s["p99_ms"], "late_max_ms": s["max_ms"]}
+
+    def format(self):
+        s = self.summary()
+        waits = f", {s['waited_s']:.2f}s in {s['waits']} wait(s)" if s['waits'] else ""
+        return (f"Playback: {s['actions']} actions, {s['passes']} pass(es), "
+                f"{s['actual_s']:.2f}s vs {s['planned_s']:.2f}s planned{waits} ({s['drift_ms']:+.1f} ms) - "
+                f"late p50/p95/p99/max {s['late_p50_ms']:.2f}/{s['late_p95_ms']:.2f}/"
+                f"{s['late_p99_ms']:.2f}/{s['late_max_ms']:.2f} ms")
+
+
+class PlaybackScheduler:
+    def __init__(self, timeline, repeats=1, start_delay=START_DELAY, repeat_gap=REPEAT_GAP,
+                 spin=SPIN, clock=time.perf_counter, sleep=time.sleep):
+        self.timeline = timeline
+        self.repeats = repeats
+        self.start_delay = start_delay
+        self.repeat_gap = repeat_gap
+        self.spin = spin
+        self.clock = clock
+        self.sleep = sleep
+
+    def wait_until(self, deadline, running):
+        """Sleep, then spin, until deadline - False if running() went False meanwhile"""
+        clock, sleep, spin = self.clock, self.sleep, self.spin
+        while True:
+            left = deadline - clock()
+            if left <= 0:
+                return True
+            if not running():
+                return False
+            if left > spin:
+                sleep(min(left - spin, MAX_SLEEP))
+            else:
+                sleep(0)  # Yield the GIL while spinning
+
+    def run(self, fire, running=lambda: True, progress=None, progress_interval=0.1):
+        """fire(action, item) for every timeline entry on its deadline -> PlaybackReport
+        For WAIT, fire blocks until the screen is ready and returns False if it wasn't (stops the run;
+        a timeout if running() still holds, otherwise the run was stopped during the wait)
+        progress(pass, item) is called at most every progress_interval seconds"""
+        tl = self.timeline
+        times, actions, items = tl.times, tl.actions, tl.items
+        period = tl.duration + self.repeat_gap
+        report = PlaybackReport()
+        record = report.lateness.record
+        clock = self.clock
+        next_progress = 0.0
+
+        with timer_resolution():
+            start = base = clock() + self.start_delay
+            for rep in range(self.repeats):
+                for j in range(len(times)):
+                    deadline = base + times[j]
+                    if not self.wait_until(deadline, running):
+                        report.stopped = True
+                        break
+                    now = clock()
+                    ok = fire(actions[j], items[j])
+                    record(max(0.0, now - deadline))
+                    report.actions += 1
+                    if actions[j] == WAIT:
+                        # Re-base: the rest of the pass is timed from when the wait ended
+                        shift = max(0.0, clock() - deadline)
+                        base += shift
+                        report.waits += 1
+                        report.waited += shift
+                        if ok is False:
+                            if running():
+                                report.timed_out = items[j]
+                            report.stopped = True
+                            break
+                    if progress is not None and now >= next_progress:
+                        next_progress = now + progress_interval
+                        progress(rep, items[j])
+                if report.stopped:
+                    break
+                # Trailing delay items still count
+                if not self.wait_until(base + tl.duration, running):
+                    report.stopped = True
+                    break
+                report.passes += 1
+                base += period
+
+            report.actual = max(0.0, clock() - start)
+            # A run cut short has no plan to compare against
+            if report.stopped:
+                report.planned = max(0.0, report.actual - report.waited)
+            else:
+                report.planned = self.repeats * period - self.repeat_gap
+        return report
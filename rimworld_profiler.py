@@ -0,0 +1,158 @@
+"""
+On-demand sampling profiler for a live session
+- A background thread samples every thread's stack (roller, OCR pool, log writer, UI)
+- Output: collapsed stacks for flamegraph tools + a text summary
+- The roll thread also runs cProfile while profiling (exact call counts / times)
+- Nothing is hooked while stopped
+
+    flamegraph.pl profiles/profile_20250101_120000.collapsed > roll.svg
+"""
+
+import collections
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+PROFILE_DIR = "profiles"
+
+
+def _frame_name(code, lineno):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, out_dir=PROFILE_DIR):
+        self.interval = interval  # Seconds between samples (5ms = 200 Hz)
+        self.out_dir = out_dir
+        self.stacks = collections.Counter()  # "thread;outer;...;leaf" -> samples
+        self.samples = 0
+        self.running = False
+        self.thread = None
+        self.started = None
+        self.elapsed = 0.0
+        # cProfile per participating thread (see enter_thread)
+        self.lock = threading.Lock()
+        self.profiles = []
+        self.active_threads = 0
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.profiles = []
+        self.running = True
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self, wait=2.0):
+        """Stop sampling - gives threads inside enter_thread() up to wait seconds to leave"""
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        self.idle.wait(wait)
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        names = {}
+        while self.running:
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    name = names.get(ident, str(ident))
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code, frame.f_lineno))
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    # cProfile only sees the thread that enables it, so hot threads opt in
+    def enter_thread(self):
+        """Called by a thread that wants exact cProfile stats - returns the profile"""
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # Another profiler already owns this thread - samples still cover it
+            return None
+        with self.lock:
+            self.active_threads += 1
+            self.idle.clear()
+        return prof
+
+    def leave_thread(self, prof):
+        if prof is None:
+            return
+        prof.disable()
+        with self.lock:
+            self.profiles.append(prof)
+            self.active_threads -= 1
+            if not self.active_threads:
+                self.idle.set()
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed format: one "frame;frame;... count" line per stack"""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self, top=30):
+        out = io.StringIO()
+        out.write(f"Sampled {self.samples} times over {self.elapsed:.1f}s "
+                  f"(every {self.interval * 1000:g} ms)\n\n")
+
+        # Sampled self / total time per function, all threads
+        own = collections.Counter()
+        total = collections.Counter()
+        threads = collections.Counter()
+        for stack, n in self.stacks.items():
+            parts = stack.split(";")
+            threads[parts[0]] += n
+            own[parts[-1]] += n
+            for func in set(parts[1:]):
+                total[func] += n
+        out.write("Samples per thread:\n")
+        for name, n in threads.most_common():
+            out.write(f"  {n:8d}  {name}\n")
+        out.write(f"\nTop {top} functions by own samples (all threads):\n")
+        out.write(f"  {'own':>8}  {'total':>8}  function\n")
+        for func, n in own.most_common(top):
+            out.write(f"  {n:8d}  {total[func]:8d}  {func}\n")
+
+        with self.lock:
+            profiles = list(self.profiles)
+        if profiles:
+            stats = pstats.Stats(profiles[0], stream=out)
+            for prof in profiles[1:]:
+                stats.add(prof)
+            out.write(f"\ncProfile ({len(profiles)} thread(s)), by cumulative time:\n")
+            stats.sort_stats("cumulative").print_stats(top)
+            out.write("cProfile by own time:\n")
+            stats.sort_stats("tottime").print_stats(top)
+        return out.getvalue()
+
+    def save(self, prefix=None):
+        """Write .collapsed and .txt files - returns (collapsed path, summary path)"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        prefix = prefix or time.strftime("profile_%Y%m%d_%H%M%S")
+        base = os.path.join(self.out_dir, prefix)
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        return base + ".collapsed", base + ".txt"
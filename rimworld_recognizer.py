@@ -0,0 +1,234 @@
+"""
+Trait recognizer - skips OCR for traits it has already seen
+- Splits the thresholded panel into text lines / trait cells
+- Looks each cell up in a trait-image dictionary (exact hash, then bit signature)
+- Only unseen cells go to Tesseract (one --psm 7 call per cell, in parallel)
+- Known results are cached to disk
+"""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+CACHE_FILE = "trait_cache.json"
+
+# Signature size (w, h) for near-duplicate matching of a cell image
+SIG_SIZE = (64, 12)
+
+# Popcount for every byte value, for fast hamming distance
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+# Trait labels as shown in game (normalized: lowercase, no hyphens)
+KNOWN_TRAITS = {
+    "abrasive", "annoying voice", "ascetic", "asexual", "beautiful", "bisexual",
+    "bloodlust", "body modder", "body purist", "brawler", "cannibal",
+    "careful shooter", "chemical fascination", "chemical interest",
+    "creepy breathing", "delicate", "depressive", "fast learner", "fast walker",
+    "gay", "gourmand", "great memory", "greedy", "hard worker", "industrious",
+    "iron willed", "jealous", "jogger", "kind", "lazy", "masochist", "misandrist",
+    "misogynist", "nervous", "neurotic", "night owl", "nimble", "nudist",
+    "optimist", "pessimist", "pretty", "psychically deaf", "psychically dull",
+    "psychically hypersensitive", "psychically sensitive", "psychopath",
+    "pyromaniac", "quick sleeper", "sanguine", "sickly", "slothful", "slow learner",
+    "slowpoke", "staggeringly ugly", "steadfast", "super immune", "teetotaler",
+    "too smart", "tortured artist", "tough", "transhumanist", "trigger happy",
+    "ugly", "undergrounder", "very neurotic", "volatile", "wimp",
+}
+
+_non_letters = re.compile(r"[^a-z ]+")
+_spaces = re.compile(r"\s+")
+
+
+def normalize_trait(text):
+    """Lowercase, hyphens/underscores to spaces, letters only"""
+    text = text.lower().replace("-", " ").replace("_", " ")
+    text = _non_letters.sub("", text)
+    return _spaces.sub(" ", text).strip()
+
+
+def _runs(mask):
+    """Start/end indices of consecutive True runs in a 1D bool array"""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def segment_lines(binary, min_height=5):
+    """Row projection - returns (y0, y1) of each text line"""
+    rows = np.count_nonzero(binary, axis=1) > 0
+    return [(y0, y1) for y0, y1 in _runs(rows) if y1 - y0 >= min_height]
+
+
+def segment_cells(binary, min_height=5, word_gap=10):
+    """Split lines into trait cells - gaps wider than word_gap separate traits"""
+    cells = []
+    for y0, y1 in segment_lines(binary, min_height):
+        cols = np.count_nonzero(binary[y0:y1], axis=0) > 0
+        runs = _runs(cols)
+        if not runs:
+            continue
+        # Merge letter/word runs closer than word_gap ("iron willed" stays one cell)
+        x0, x1 = runs[0]
+        for start, end in runs[1:]:
+            if start - x1 < word_gap:
+                x1 = end
+            else:
+                cells.append((y0, y1, x0, x1))
+                x0, x1 = start, end
+        cells.append((y0, y1, x0, x1))
+    return cells
+
+
+def prepare_for_ocr(crop, pad=6):
+    """Dark text on white with a margin - what Tesseract likes for --psm 7"""
+    return cv2.copyMakeBorder(255 - crop, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+
+
+class TraitImageDictionary:
+    """Cache of cell image -> trait text, persisted between sessions"""
+
+    def __init__(self, path=CACHE_FILE, max_distance=24, size_tolerance=3):
+        self.path = path
+        self.max_distance = max_distance      # Max differing signature bits
+        self.size_tolerance = size_tolerance  # Max px difference in width/height
+        self.exact = {}
+        self.texts = []
+        self.sizes = np.zeros((0, 2), dtype=np.int32)
+        self.sigs = np.zeros((0, SIG_SIZE[0] * SIG_SIZE[1] // 8), dtype=np.uint8)
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def digest(crop):
+        h = hashlib.blake2b(crop.tobytes(), digest_size=12)
+        h.update(np.int32(crop.shape).tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def signature(crop):
+        small = cv2.resize(crop, SIG_SIZE, interpolation=cv2.INTER_AREA)
+        return np.packbits(small > 127)
+
+    def lookup(self, crop):
+        """Return cached text for this cell, or None if never seen"""
+        key = self.digest(crop)
+        text = self.exact.get(key)
+        if text is not None or not self.texts:
+            return text
+
+        # Near match: similar size and few differing signature bits
+        h, w = crop.shape
+        close = np.flatnonzero(
+            (np.abs(self.sizes[:, 0] - w) <= self.size_tolerance) &
+            (np.abs(self.sizes[:, 1] - h) <= self.size_tolerance))
+        if not len(close):
+            return None
+        dist = POPCOUNT[self.sigs[close] ^ self.signature(crop)].sum(axis=1)
+        best = int(np.argmin(dist))
+        if dist[best] > self.max_distance:
+            return None
+
+        # Remember this exact rendering too
+        text = self.texts[close[best]]
+        self.exact[key] = text
+        self.dirty = True
+        return text
+
+    def add(self, crop, text):
+        self.exact[self.digest(crop)] = text
+        h, w = crop.shape
+        self.texts.append(text)
+        self.sizes = np.vstack([self.sizes, [[w, h]]])
+        self.sigs = np.vstack([self.sigs, self.signature(crop)[None, :]])
+        self.dirty = True
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        if data.get("sig_size") != list(SIG_SIZE):
+            return
+        self.exact = dict(data.get("exact", {}))
+        entries = data.get("entries", [])
+        self.texts = [e["text"] for e in entries]
+        if entries:
+            self.sizes = np.array([[e["w"], e["h"]] for e in entries], dtype=np.int32)
+            self.sigs = np.array([np.frombuffer(bytes.fromhex(e["sig"]), dtype=np.uint8) for e in entries])
+        self.dirty = False
+
+    def save(self):
+        if not self.dirty:
+            return
+        entries = [{"text": t, "w": int(w), "h": int(h), "sig": s.tobytes().hex()}
+                   for t, (w, h), s in zip(self.texts, self.sizes, self.sigs)]
+        data = {"sig_size": list(SIG_SIZE), "exact": self.exact, "entries": entries}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+class TraitRecognizer:
+    """Cells -> trait strings; dictionary first, OCR only for unseen cells"""
+
+    def __init__(self, ocr, dictionary=None, known=KNOWN_TRAITS, workers=1):
+        self.ocr = ocr
+        self.dictionary = dictionary if dictionary is not None else TraitImageDictionary()
+        self.known = known
+        self.matcher = None  # Optional TraitMatcher to fix OCR misreads before caching
+        self.hits = 0
+        self.misses = 0
+        self.unread = 0  # Cells in the last panel that OCR couldn't read
+        # Unseen cells are OCR'd concurrently - tesseract releases the GIL
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") if workers > 1 else None
+
+    def ocr_cell(self, crop):
+        """Single line OCR of one trait cell"""
+        return normalize_trait(self.ocr.image_to_string(prepare_for_ocr(crop), psm=7))
+
+    def recognize(self, binary):
+        """Return list of normalized trait strings found in the binary panel
+        Cells OCR read as nothing are left out and counted in self.unread"""
+        cells = segment_cells(binary)
+        traits = [None] * len(cells)
+        unseen = []
+        for i, (y0, y1, x0, x1) in enumerate(cells):
+            crop = binary[y0:y1, x0:x1]
+            traits[i] = self.dictionary.lookup(crop)
+            if traits[i] is None:
+                unseen.append((i, crop))
+
+        if unseen:
+            self.misses += len(unseen)
+            crops = [crop for _, crop in unseen]
+            if self.pool and len(crops) > 1:
+                texts = list(self.pool.map(self.ocr_cell, crops))
+            else:
+                texts = [self.ocr_cell(crop) for crop in crops]
+            for (i, crop), text in zip(unseen, texts):
+                traits[i] = text
+                if self.matcher and text not in self.known:
+                    text = self.matcher.match(text)[0] or text
+                # Only cache real trait names so OCR mistakes don't stick
+                if text in self.known:
+                    self.dictionary.add(crop, text)
+        self.hits += len(cells) - len(unseen)
+
+        found = [t for t in traits if t]
+        self.unread = len(cells) - len(found)
+        return found
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown(wait=False)
+            self.pool = None
@@ -0,0 +1,124 @@
+"""
+Click recorder fed straight from the mouse hook
+- Position comes from the hook's own move events (tracked in the hook), not from
+  asking the OS for the cursor later, so a fast click lands where it happened
+- The hook thread only writes (time, x, y, button) into a fixed ring of arrays;
+  single producer / single consumer, no lock
+- The UI drains the ring in batches; inter-click gaps come from the event times
+  and can be kept as delay steps (minus the time playback itself spends on a click,
+  so press-to-press gaps replay as recorded)
+- Windows reports the second click of a quick pair as "double" - that's a click too
+"""
+
+from array import array
+
+from rimworld_macro import BUTTONS
+from rimworld_playback import HOLD, MOVE_SETTLE
+
+MIN_GAP_MS = 50      # Shortest delay step the editor allows
+MAX_GAP_MS = 30000   # Longest
+DRAIN_MS = 50        # How often the UI empties the ring while recording
+CLICK_MS = round((MOVE_SETTLE + HOLD) * 1000)  # Playback's own time from one press to the next step
+
+
+class EventRing:
+    """Fixed-size single-producer / single-consumer ring of click events"""
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.xs = array("i", bytes(4 * capacity))
+        self.ys = array("i", bytes(4 * capacity))
+        self.buttons = array("B", bytes(capacity))
+        self.head = 0  # Events written (producer only)
+        self.tail = 0  # Events read (consumer only)
+        self.dropped = 0
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def push(self, t, x, y, button):
+        h = self.head
+        if h - self.tail >= self.capacity:
+            self.dropped += 1
+            return False
+        i = h % self.capacity
+        self.times[i] = t
+        self.xs[i] = x
+        self.ys[i] = y
+        self.buttons[i] = button
+        self.head = h + 1  # Publish only after the slot is filled
+        return True
+
+    def drain(self):
+        """All events written so far -> [(time, x, y, button code)]"""
+        h, t = self.head, self.tail
+        cap = self.capacity
+        out = [(self.times[i % cap], self.xs[i % cap], self.ys[i % cap], self.buttons[i % cap])
+               for i in range(t, h)]
+        self.tail = h
+        return out
+
+
+class ClickRecorder:
+    def __init__(self, capacity=4096, active=lambda: True):
+        self.ring = EventRing(capacity)
+        self.active = active     # Checked per event, so a stop takes effect at once
+        self.x = self.y = 0      # Cursor as last reported by the hook
+        self.last_time = None    # Time of the last drained click
+        self.clicks = 0
+        self.min_gap = None      # Shortest gap between clicks (s)
+        self._mouse = None
+
+    def start(self):
+        import mouse
+        self._mouse = mouse
+        self.x, self.y = mouse.get_position()
+        self._down = (mouse.DOWN, mouse.DOUBLE)
+        self._codes = {name: i for i, name in enumerate(BUTTONS)}
+        self._move = mouse.MoveEvent
+        self._button = mouse.ButtonEvent
+        mouse.hook(self._on_event)
+
+    def stop(self):
+        if self._mouse is not None:
+            try:
+                self._mouse.unhook(self._on_event)
+            except ValueError:
+                pass
+            self._mouse = None
+
+    def _on_event(self, event):
+        # Hook thread - keep this short
+        kind = type(event)
+        if kind is self._move:
+            self.x, self.y = event.x, event.y
+        elif kind is self._button and event.event_type in self._down and self.active():
+            code = self._codes.get(event.button)
+            if code is not None:
+                self.ring.push(event.time, self.x, self.y, code)
+
+    def drain(self, keep_timing=False):
+        """Recorded clicks since the last drain -> sequence steps
+        keep_timing: gaps that leave MIN_GAP_MS or more after CLICK_MS become delay steps"""
+        steps = []
+        for t, x, y, button in self.ring.drain():
+            if self.last_time is not None:
+                gap = t - self.last_time
+                if self.min_gap is None or gap < self.min_gap:
+                    self.min_gap = gap
+                gap_ms = round(gap * 1000) - CLICK_MS
+                if keep_timing and gap_ms >= MIN_GAP_MS:
+                    steps.append({'type': 'delay', 'delay_ms': min(gap_ms, MAX_GAP_MS)})
+            self.last_time = t
+            self.clicks += 1
+            steps.append({'x': x, 'y': y, 'button': BUTTONS[button], 'type': 'click', 'random_offset': 0})
+        return steps
+
+    def summary(self):
+        text = f"{self.clicks} clicks recorded"
+        if self.min_gap is not None:
+            text += f", fastest gap {self.min_gap * 1000:.0f} ms"
+        if self.ring.dropped:
+            text += f", {self.ring.dropped} lost (buffer full)"
+        return text
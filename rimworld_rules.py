@@ -0,0 +1,277 @@
+"""
+Trait rule engine
+- Small rule language, e.g.
+    (tough OR iron willed) AND NOT pyromaniac AND at least 2 of {jogger, nimble, fast walker}
+- Every trait gets a bit; a roll becomes one int mask
+- Rules compile to closures doing a few integer ops on that mask
+"""
+
+import re
+
+from rimworld_recognizer import normalize_trait
+
+RULE_ACTIONS = ("stop", "pause")
+
+_popcount = getattr(int, "bit_count", None) or (lambda m: bin(m).count("1"))
+
+_token_re = re.compile(r'\s*(?:(\()|(\))|(\{)|(\})|(,)|"([^"]*)"|(\d+)|([^\s(){},"]+))')
+_keywords = {"and", "or", "not", "of", "at", "least"}
+
+
+class RuleError(ValueError):
+    """Bad rule text or config"""
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = _token_re.match(text, pos)
+        if not m or m.end() == pos:
+            raise RuleError(f"Unexpected character at {pos}: {text[pos:pos + 10]!r}")
+        pos = m.end()
+        lparen, rparen, lbrace, rbrace, comma, quoted, number, word = m.groups()
+        if quoted is not None:
+            tokens.append(("word", quoted))
+        elif number is not None:
+            tokens.append(("num", int(number)))
+        elif word is not None:
+            lower = word.lower()
+            tokens.append(("kw", lower) if lower in _keywords else ("word", word))
+        else:
+            tokens.append(("sym", lparen or rparen or lbrace or rbrace or comma))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser -> nested tuples
+    ("trait", name) / ("and", [..]) / ("or", [..]) / ("not", node) / ("count", n, [names])"""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        tok = self.peek()
+        if tok[0] is None or (kind and tok[0] != kind) or (value is not None and tok[1] != value):
+            want = value if value is not None else kind
+            raise RuleError(f"Expected {want!r} in rule: {self.text}")
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise RuleError(f"Unexpected {self.peek()[1]!r} in rule: {self.text}")
+        return node
+
+    def parse_or(self):
+        items = [self.parse_and()]
+        while self.peek() == ("kw", "or"):
+            self.take()
+            items.append(self.parse_and())
+        return items[0] if len(items) == 1 else ("or", items)
+
+    def parse_and(self):
+        items = [self.parse_not()]
+        while self.peek() == ("kw", "and"):
+            self.take()
+            items.append(self.parse_not())
+        return items[0] if len(items) == 1 else ("and", items)
+
+    def parse_not(self):
+        if self.peek() == ("kw", "not"):
+            self.take()
+            return ("not", self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, value = self.peek()
+        if (kind, value) == ("sym", "("):
+            self.take()
+            node = self.parse_or()
+            self.take("sym", ")")
+            return node
+        if (kind, value) == ("kw", "at"):
+            self.take()
+            self.take("kw", "least")
+            kind = self.peek()[0]
+        if kind == "num":
+            n = self.take("num")[1]
+            self.take("kw", "of")
+            self.take("sym", "{")
+            names = [self.parse_name()]
+            while self.peek() == ("sym", ","):
+                self.take()
+                names.append(self.parse_name())
+            self.take("sym", "}")
+            return ("count", n, names)
+        return ("trait", self.parse_name())
+
+    def parse_name(self):
+        """Trait name - quoted, or consecutive bare words ("iron willed")"""
+        words = [self.take("word")[1]]
+        while self.peek()[0] == "word":
+            words.append(self.take()[1])
+        name = normalize_trait(" ".join(words))
+        if not name:
+            raise RuleError(f"Empty trait name in rule: {self.text}")
+        return name
+
+
+def parse_rule(text):
+    return _Parser(text).parse()
+
+
+def rule_traits(node):
+    """All trait names referenced by a parsed rule"""
+    if node[0] == "trait":
+        return {node[1]}
+    if node[0] == "not":
+        return rule_traits(node[1])
+    if node[0] == "count":
+        return set(node[2])
+    return set().union(*(rule_traits(n) for n in node[1]))
+
+
+def uses_not(node):
+    """Rule has a NOT somewhere - a trait that wasn't read could be the one it excludes"""
+    if node[0] == "not":
+        return True
+    if node[0] in ("and", "or"):
+        return any(uses_not(n) for n in node[1])
+    return False
+
+
+def _compile(node, vocab):
+    """Parsed node -> (test(mask) -> bool, bits used)"""
+    kind = node[0]
+    if kind == "trait":
+        bit = vocab[node[1]]
+        return (lambda m: m & bit != 0), bit
+    if kind == "count":
+        bits = 0
+        for name in node[2]:
+            bits |= vocab[name]
+        n = node[1]
+        return (lambda m: _popcount(m & bits) >= n), bits
+    if kind == "not":
+        test, bits = _compile(node[1], vocab)
+        return (lambda m: not test(m)), bits
+
+    # and/or: plain traits fold into a single mask test
+    plain = 0
+    tests = []
+    used = 0
+    for child in node[1]:
+        if child[0] == "trait":
+            plain |= vocab[child[1]]
+        else:
+            test, bits = _compile(child, vocab)
+            tests.append(test)
+            used |= bits
+    used |= plain
+    if kind == "and":
+        if plain:
+            tests.insert(0, lambda m: m & plain == plain)
+        return (lambda m: all(t(m) for t in tests)), used
+    if plain:
+        tests.insert(0, lambda m: m & plain != 0)
+    return (lambda m: any(t(m) for t in tests)), used
+
+
+class Rule:
+    """One named target - action is "stop" or "pause" (for pause seconds)"""
+
+    def __init__(self, name, text, action="stop", pause=5.0):
+        if action not in RULE_ACTIONS:
+            raise RuleError(f"Rule {name!r}: action must be one of {RULE_ACTIONS}")
+        self.name = name
+        self.text = text
+        self.action = action
+        try:
+            self.pause = float(pause)
+        except (TypeError, ValueError):
+            raise RuleError(f"Rule {name!r}: pause must be a number of seconds, not {pause!r}")
+        self.tree = parse_rule(text)
+        self.negated = uses_not(self.tree)
+        self.test = None
+        self.bits = 0
+
+
+class RuleSet:
+    """Compiled rules over a trait-bit vocabulary; first matching rule wins"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        names = set()
+        for rule in self.rules:
+            names |= rule_traits(rule.tree)
+        self.traits = sorted(names)
+        self.vocab = {name: 1 << i for i, name in enumerate(self.traits)}
+        for rule in self.rules:
+            rule.test, rule.bits = _compile(rule.tree, self.vocab)
+
+    @classmethod
+    def from_config(cls, rules):
+        """rules: list of {"name", "when", "action", "pause"} dicts"""
+        out = []
+        for i, r in enumerate(rules):
+            if not isinstance(r, dict) or not r.get("when"):
+                raise RuleError(f"Rule #{i + 1} needs a \"when\" expression")
+            out.append(Rule(r.get("name", f"rule {i + 1}"), r["when"],
+                            r.get("action", "stop"), r.get("pause", 5)))
+        return cls(out)
+
+    @classmethod
+    def from_lists(cls, list_a, list_b, pause=5.0):
+        """Classic behaviour: one MUST HAVE + one other trait from list B, pause on MUST HAVE only"""
+        if not list_a:
+            raise RuleError("MUST HAVE list is empty")
+        any_a = "1 of {%s}" % ", ".join(f'"{t}"' for t in sorted(list_a))
+        rules = []
+        if list_b:
+            any_b = "1 of {%s}" % ", ".join(f'"{t}"' for t in sorted(list_b))
+            # A trait in both lists must not count twice
+            both = "2 of {%s}" % ", ".join(f'"{t}"' for t in sorted(set(list_a) | set(list_b)))
+            rules.append(Rule("combo", f"{any_a} AND {any_b} AND {both}", "stop"))
+        rules.append(Rule("partial", any_a, "pause", pause))
+        return cls(rules)
+
+    def mask(self, traits):
+        """Trait names -> bit mask (traits no rule mentions are ignored)"""
+        m = 0
+        vocab = self.vocab
+        for t in traits:
+            m |= vocab.get(t, 0)
+        return m
+
+    def evaluate(self, mask, complete=True):
+        """First matching rule or None
+        complete=False: some cell wasn't read, so rules with NOT can't be trusted and are skipped
+        (rules without NOT only need traits that were read, they can't fire by mistake)"""
+        for rule in self.rules:
+            if (complete or not rule.negated) and rule.test(mask):
+                return rule
+        return None
+
+    def names(self, mask):
+        """Trait names set in mask, for logging"""
+        return [t for t in self.traits if mask & self.vocab[t]]
+
+
+def split_traits(text):
+    """One trait per line (UI / config text) -> set of normalized names"""
+    return {normalize_trait(t) for t in text.split("\n") if t.strip()}
+
+
+def ruleset_from_config(config):
+    """Config "rules" if present, otherwise the classic list_a / list_b pair"""
+    if config.get("rules"):
+        return RuleSet.from_config(config["rules"])
+    return RuleSet.from_lists(split_traits(config.get("list_a", "")), split_traits(config.get("list_b", "")))
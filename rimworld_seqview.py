@@ -0,0 +1,192 @@
+"""
+Virtualized view of a click sequence
+- The Listbox only ever holds the rows that fit on screen; the scrollbar drives
+  an offset into the sequence instead of scrolling the widget
+- Edits tell the view what changed (append / insert / delete / change), and only
+  visible rows whose text differs are rewritten, so cost per event doesn't grow
+  with the sequence
+- Row text is built on demand, numbering follows the current position
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+
+def sequence_row(i, item):
+    """List text for sequence item i"""
+    if item['type'] == 'click':
+        button_name = item['button'].capitalize()
+        offset = item.get('random_offset', 0)
+        if offset > 0:
+            return f"{i+1:3d}. {button_name} click at ({item['x']}, {item['y']}) [±{offset}px]"
+        return f"{i+1:3d}. {button_name} click at ({item['x']}, {item['y']})"
+    if item['type'] == 'delay':
+        return f"{i+1:3d}. DELAY {item['delay_ms']}ms"
+    if item['type'].startswith('wait_'):
+        where = f"({item['x']}, {item['y']} {item['w']}x{item['h']})"
+        if item['type'] == 'wait_change':
+            what = f"region {where} changes"
+        elif item['type'] == 'wait_pixel':
+            what = f"{item['color']} ±{item['tolerance']} in {where}"
+        else:
+            what = f"text \"{item['text']}\" in {where}"
+        return f"{i+1:3d}. WAIT {what}, max {item['timeout_ms']}ms"
+    return f"{i+1:3d}. {item['type']}"
+
+
+class SequenceView:
+    def __init__(self, parent, items, font=("Consolas", 9), row_text=sequence_row):
+        self.items = items  # The sequence itself (shared, not copied)
+        self.row_text = row_text
+        self.top = 0        # Sequence index of the first visible row
+        self.rows = 1       # Rows that fit in the widget
+        self.selected = None
+        self.rendered = []  # Text currently in the Listbox
+        self.rendered_top = 0
+        self.follow = True  # Keep the last row in view while it's being appended to
+        self.line_height = max(1, tkfont.Font(font=font).metrics("linespace") + 1)
+
+        self.listbox = tk.Listbox(parent, font=font, exportselection=False, activestyle="none")
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        lb = self.listbox
+        lb.bind("<Configure>", self._on_resize)
+        lb.bind("<<ListboxSelect>>", self._on_select)
+        lb.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units", 3))
+        lb.bind("<Button-4>", lambda e: self.scroll(-1, "units", 3))
+        lb.bind("<Button-5>", lambda e: self.scroll(1, "units", 3))
+        lb.bind("<Up>", lambda e: self._step(-1))
+        lb.bind("<Down>", lambda e: self._step(1))
+        lb.bind("<Prior>", lambda e: self._step(-self.rows))
+        lb.bind("<Next>", lambda e: self._step(self.rows))
+
+    def bind(self, sequence, fn):
+        self.listbox.bind(sequence, fn)
+
+    # Model changes
+
+    def set_items(self, items):
+        """Whole new sequence (load / clear)"""
+        self.items = items
+        self.top = 0
+        self.selected = None
+        self.follow = True
+        self.render()
+
+    def appended(self):
+        """Items were added at the end (recording) - also safe to call for any length change"""
+        if self.follow:
+            self.top = max(0, len(self.items) - self.rows)
+        self.render()
+
+    def inserted(self, index):
+        if self.selected is not None and self.selected >= index:
+            self.selected += 1
+        self.render()
+
+    def deleted(self, index):
+        if self.selected is not None:
+            if self.selected == index:
+                self.selected = None
+            elif self.selected > index:
+                self.selected -= 1
+        self.render()
+
+    def changed(self, index):
+        if self.top <= index < self.top + self.rows:
+            self.render()
+
+    # Selection
+
+    def selection(self):
+        """Selected sequence index or None"""
+        if self.selected is not None and self.selected >= len(self.items):
+            self.selected = None
+        return self.selected
+
+    def select(self, index):
+        self.selected = index
+        self.see(index)
+        self.render()
+
+    def see(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+
+    # Rendering
+
+    def render(self):
+        n = len(self.items)
+        self.top = max(0, min(self.top, n - self.rows))
+        end = min(n, self.top + self.rows)
+        rows = [self.row_text(i, self.items[i]) for i in range(self.top, end)]
+
+        lb = self.listbox
+        old = self.rendered
+        # Scrolled by part of a window: drop/add rows at the ends instead of rewriting all
+        shift = self.top - self.rendered_top
+        if 0 < shift < len(old):
+            lb.delete(0, shift - 1)
+            old = old[shift:]
+        elif 0 < -shift < len(rows):
+            for text in reversed(rows[:-shift]):
+                lb.insert(0, text)
+            old = rows[:-shift] + old
+        for j, text in enumerate(rows):
+            if j >= len(old):
+                lb.insert(tk.END, text)
+            elif old[j] != text:
+                lb.delete(j)
+                lb.insert(j, text)
+        if len(old) > len(rows):
+            lb.delete(len(rows), tk.END)
+        self.rendered = rows
+        self.rendered_top = self.top
+
+        lb.selection_clear(0, tk.END)
+        if self.selected is not None and self.top <= self.selected < end:
+            lb.selection_set(self.selected - self.top)
+        self.follow = end >= n
+        if n:
+            self.scrollbar.set(self.top / n, end / n)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, amount, what="units", step=1):
+        if what == "pages":
+            amount *= max(1, self.rows - 1)
+        else:
+            amount *= step
+        self.top += int(amount)
+        self.render()
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.items))
+            self.render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def _on_resize(self, event):
+        rows = max(1, event.height // self.line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def _on_select(self, event):
+        sel = self.listbox.curselection()
+        if sel:
+            self.selected = self.top + sel[0]
+
+    def _step(self, delta):
+        if not self.items:
+            return "break"
+        current = self.selected if self.selected is not None else self.top - (1 if delta > 0 else 0)
+        self.select(max(0, min(len(self.items) - 1, current + delta)))
+        return "break"
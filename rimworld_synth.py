@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Synthetic trait panels for recognition benchmarks
+- Renders random trait combos in the RimWorld panel style (boxes, light text, dark UI)
+- Same 300x100 geometry as the live capture
+- Fonts, UI scale, noise, JPEG artifacts and background are configurable
+- Streams straight into the benchmark or writes PNGs + labels.json
+
+    python rimworld_synth.py --out synthetic/ --count 2000 --noise 4 --jpeg 60-95
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from rimworld_capture import ScreenSource
+from rimworld_recognizer import KNOWN_TRAITS
+
+PANEL_SIZE = (300, 100)
+
+# In-game spelling where it differs from plain capitalization
+DISPLAY_NAMES = {"iron willed": "Iron-willed", "trigger happy": "Trigger-happy"}
+
+DEFAULT_FONTS = ["arial.ttf", "Arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf"]
+
+
+def display_name(trait):
+    return DISPLAY_NAMES.get(trait, trait[:1].upper() + trait[1:])
+
+
+def parse_range(text, cast=float):
+    """ "60-95" -> (60, 95), "80" -> (80, 80) """
+    if text is None:
+        return None
+    lo, _, hi = str(text).partition("-")
+    return cast(lo), cast(hi or lo)
+
+
+class SyntheticPanelGenerator:
+    """Random trait panels with ground truth"""
+
+    def __init__(self, traits=None, fonts=None, font_size=13, scale=(1.0, 1.0),
+                 noise=0.0, jpeg=None, background=(20, 45), max_traits=3, seed=None):
+        self.traits = sorted(traits or KNOWN_TRAITS)
+        self.font_size = font_size
+        self.scale = scale            # (min, max) UI scale factor
+        self.noise = noise            # Gaussian noise sigma (0-255)
+        self.jpeg = jpeg              # (min, max) JPEG quality, None = no compression
+        self.background = background  # (min, max) base gray of the panel
+        self.max_traits = max_traits
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.font_paths = fonts or DEFAULT_FONTS
+        self.fonts = {}
+
+    def font(self, size):
+        """First loadable font at this pixel size (cached)"""
+        key = (self.rng.choice(self.font_paths), size)
+        if key not in self.fonts:
+            try:
+                self.fonts[key] = ImageFont.truetype(key[0], size)
+            except (OSError, IOError):
+                try:
+                    self.fonts[key] = ImageFont.load_default(size)
+                except TypeError:
+                    self.fonts[key] = ImageFont.load_default()
+        return self.fonts[key]
+
+    def sample_traits(self):
+        return self.rng.sample(self.traits, self.rng.randint(1, self.max_traits))
+
+    def render(self, traits):
+        """Trait list -> grayscale numpy panel"""
+        w, h = PANEL_SIZE
+        scale = self.rng.uniform(*self.scale)
+        base = self.rng.randint(*self.background)
+        img = Image.new("L", PANEL_SIZE, base)
+        draw = ImageDraw.Draw(img)
+
+        # Subtle vertical gradient like the game's window background
+        shade = self.rng.randint(-8, 8)
+        for y in range(0, h, 4):
+            draw.rectangle([0, y, w, y + 3], fill=max(0, min(255, base + shade * y // h)))
+
+        font = self.font(max(6, int(round(self.font_size * scale))))
+        pad = max(2, int(round(4 * scale)))
+        gap = max(3, int(round(6 * scale)))
+        x = y = pad
+        row_h = 0
+        for trait in traits:
+            label = display_name(trait)
+            left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+            bw, bh = right - left + 2 * pad, bottom - top + 2 * pad
+            if x + bw > w - pad and x > pad:
+                x, y = pad, y + row_h + gap
+                row_h = 0
+            # Trait box: slightly lighter fill, dim border, bright text
+            draw.rectangle([x, y, x + bw, y + bh], fill=min(255, base + 25), outline=min(255, base + 60))
+            draw.text((x + pad - left, y + pad - top), label, font=font, fill=self.rng.randint(210, 245))
+            x += bw + gap
+            row_h = max(row_h, bh)
+
+        gray = np.array(img)
+        if self.noise:
+            noisy = gray.astype(np.float32) + self.np_rng.normal(0, self.noise, gray.shape)
+            gray = np.clip(noisy, 0, 255).astype(np.uint8)
+        if self.jpeg:
+            quality = self.rng.randint(*self.jpeg)
+            ok, buf = cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            gray = cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+        return gray
+
+    def sample(self, index=None):
+        """-> (grayscale panel, ground truth traits)
+        With an index the panel is reproducible (same seed + index = same panel)"""
+        if index is not None:
+            self.rng.seed(f"{self.seed}:{index}")
+            self.np_rng = np.random.default_rng([self.seed or 0, index])
+        traits = self.sample_traits()
+        return self.render(traits), traits
+
+    def stream(self, count):
+        for _ in range(count):
+            yield self.sample()
+
+
+class SyntheticSource(ScreenSource):
+    """Replay-compatible source of generated panels
+    Frames are rendered on demand (only the current one is kept), labels fill self.labels"""
+
+    def __init__(self, generator, count):
+        self.generator = generator
+        self.count = count
+        self.labels = {}
+        self.index = 0
+        self.exhausted = False
+        self._frame_index = None
+        self._frame = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def key(self):
+        return str(self.index)
+
+    def grab(self, bbox):
+        if self._frame_index != self.index:
+            self._frame, self.labels[self.key] = self.generator.sample(self.index)
+            self._frame_index = self.index
+        return self._frame
+
+    def advance(self):
+        if self.index + 1 < self.count:
+            self.index += 1
+        else:
+            self.exhausted = True
+
+
+def add_generator_args(parser):
+    """Generator options shared with the benchmark CLI"""
+    parser.add_argument("--font", action="append", help="TTF font file (repeat for several)")
+    parser.add_argument("--font-size", type=int, default=13)
+    parser.add_argument("--scale", default="1.0", help="UI scale or range, e.g. 0.9-1.25")
+    parser.add_argument("--noise", type=float, default=0.0, help="Gaussian noise sigma")
+    parser.add_argument("--jpeg", default=None, help="JPEG quality or range, e.g. 60-95")
+    parser.add_argument("--background", default="20-45", help="Panel base gray range")
+    parser.add_argument("--max-traits", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def generator_from_args(args):
+    return SyntheticPanelGenerator(
+        fonts=args.font, font_size=args.font_size, scale=parse_range(args.scale),
+        noise=args.noise, jpeg=parse_range(args.jpeg, int),
+        background=parse_range(args.background, int), max_traits=args.max_traits, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic trait panels")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--count", type=int, default=1000)
+    add_generator_args(parser)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    generator = generator_from_args(args)
+    labels = {}
+    for i, (gray, traits) in enumerate(generator.stream(args.count)):
+        name = f"synth_{i:06d}.png"
+        cv2.imwrite(os.path.join(args.out, name), gray)
+        labels[name] = traits
+    with open(os.path.join(args.out, "labels.json"), "w") as f:
+        json.dump(labels, f, indent=1)
+    print(f"Wrote {args.count} panels + labels.json to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+UI update bus - the only way non-Tk threads touch the window
+- Worker threads post calls, coalesced state updates and log lines
+- The Tk main loop drains them with after() at a capped rate
+- Log view keeps a fixed-size ring of recent lines
+"""
+
+import collections
+import threading
+import time
+import tkinter as tk
+
+
+class UIBus:
+    def __init__(self, root, interval_ms=50, max_calls=100, max_log_lines=500):
+        self.root = root
+        self.interval_ms = interval_ms  # Drain at most this often (50ms = 20 updates/s)
+        self.max_calls = max_calls      # Posted calls run per drain, rest wait a tick
+        self.lock = threading.Lock()
+        self.calls = collections.deque()
+        self.states = {}  # key -> (fn, args): only the latest update per key runs
+        self.log_lines = collections.deque(maxlen=max_log_lines)
+        self.log_view = None
+        self.running = False
+
+    def post(self, fn, *args):
+        """Run fn(*args) on the Tk thread (every call runs, in order)"""
+        with self.lock:
+            self.calls.append((fn, args))
+
+    def set_state(self, key, fn, *args):
+        """Run fn(*args) on the Tk thread - newer updates for the same key replace older ones"""
+        with self.lock:
+            self.states[key] = (fn, args)
+
+    def log(self, ts, msg):
+        """Queue a log line; if the UI falls behind only the newest lines are kept"""
+        with self.lock:
+            self.log_lines.append((ts, msg))
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        self.running = False
+
+    def _drain(self):
+        if not self.running:
+            return
+        with self.lock:
+            n = min(len(self.calls), self.max_calls)
+            calls = [self.calls.popleft() for _ in range(n)]
+            states = list(self.states.values())
+            self.states.clear()
+            lines = list(self.log_lines)
+            self.log_lines.clear()
+
+        for fn, args in calls + states:
+            try:
+                fn(*args)
+            except Exception:
+                pass
+        if lines and self.log_view:
+            try:
+                self.log_view.append(lines)
+            except Exception:
+                pass
+        self.root.after(self.interval_ms, self._drain)
+
+
+class LogView:
+    """Read-only text widget holding at most max_lines lines"""
+
+    def __init__(self, widget, max_lines=500):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.count = 0
+
+    def append(self, lines):
+        lines = lines[-self.max_lines:]
+        text = "".join(f"{time.strftime('%H:%M:%S', time.localtime(ts))} {msg}\n" for ts, msg in lines)
+        w = self.widget
+        w.config(state='normal')
+        w.insert(tk.END, text)
+        self.count += len(lines)
+        # Drop the oldest lines beyond the ring size
+        excess = self.count - self.max_lines
+        if excess > 0:
+            w.delete("1.0", f"{excess + 1}.0")
+            self.count -= excess
+        w.see(tk.END)
+        w.config(state='disabled')
@@ -0,0 +1,153 @@
+"""
+Screen-condition wait steps for autoclicker macros
+- wait_change: the region differs from how it looked just before the click that
+  precedes the wait (or when the wait started, if there's no such click) - same
+  thumbnail diff the roller uses to spot a redrawn panel
+- wait_pixel: a pixel in the region is within tolerance of a color
+- wait_text: OCR of the region contains the text (a few wrong letters allowed)
+- Every wait has a timeout; playback goes on the moment the condition holds
+"""
+
+import re
+import time
+
+import cv2
+import numpy as np
+
+from rimworld_capture import FrameChangeDetector, create_capture_backend
+from rimworld_match import edit_distance
+
+# Seconds between checks (OCR is the slow one)
+POLL = {"wait_change": 0.01, "wait_pixel": 0.01, "wait_text": 0.15}
+TEXT_THRESHOLD = 180  # Same binarization as the trait panel
+
+_spaces = re.compile(r"\s+")
+
+
+def step_bbox(item):
+    x, y = item['x'], item['y']
+    return (x, y, x + max(1, item.get('w', 1)), y + max(1, item.get('h', 1)))
+
+
+def parse_color(color):
+    """'#rrggbb' -> (b, g, r) to compare against BGR grabs"""
+    value = int(color.lstrip('#'), 16)
+    return (value & 0xFF, (value >> 8) & 0xFF, value >> 16)
+
+
+def normalize_text(text):
+    return _spaces.sub(" ", text.lower()).strip()
+
+
+def text_matches(found, wanted, max_distance=2):
+    """wanted appears in found - exact substring, or a same-length window within max_distance edits"""
+    found, wanted = normalize_text(found), normalize_text(wanted)
+    if not wanted or wanted in found:
+        return bool(wanted)
+    limit = min(max_distance, len(wanted) // 4)
+    if not limit:
+        return False
+    n = len(wanted)
+    for i in range(max(1, len(found) - n + 1)):
+        if edit_distance(found[i:i + n], wanted, limit) <= limit:
+            return True
+    return False
+
+
+class ScreenWaiter:
+    """Runs wait steps against the live screen - capture / OCR are created on first use"""
+
+    def __init__(self, capture_backend="auto", ocr_backend="auto", match_distance=2, backend=None, ocr=None):
+        self.capture_name = capture_backend
+        self.ocr_name = ocr_backend
+        self.match_distance = match_distance
+        self.backend = backend
+        self.ocr = ocr
+        self.detector = FrameChangeDetector()
+        self._gray = None
+        self._bgr = None
+        self._binary = None
+        self._armed = None  # bbox whose reference arm() already took
+
+    def _grab_gray(self, bbox):
+        if self.backend is None:
+            self.backend = create_capture_backend(self.capture_name)
+        h, w = bbox[3] - bbox[1], bbox[2] - bbox[0]
+        if self._gray is None or self._gray.shape != (h, w):
+            self._gray = np.empty((h, w), dtype=np.uint8)
+        self.backend.grab_into(bbox, self._gray)
+        return self._gray
+
+    def _grab_bgr(self, bbox):
+        if self.backend is None:
+            self.backend = create_capture_backend(self.capture_name)
+        h, w = bbox[3] - bbox[1], bbox[2] - bbox[0]
+        if self._bgr is None or self._bgr.shape != (h, w, 3):
+            self._bgr = np.empty((h, w, 3), dtype=np.uint8)
+        self.backend.grab_bgr_into(bbox, self._bgr)
+        return self._bgr
+
+    def wait(self, item, running=lambda: True):
+        """Block until the step's condition holds -> (met, seconds waited)
+        Not met = timed out, or running() went False"""
+        kind = item['type']
+        check = getattr(self, "_check_" + kind[len("wait_"):])
+        bbox = step_bbox(item)
+        poll = POLL[kind]
+        t0 = time.perf_counter()
+        deadline = t0 + item['timeout_ms'] / 1000.0
+
+        self._start(kind, bbox)
+        while True:
+            if check(item, bbox):
+                return True, time.perf_counter() - t0
+            now = time.perf_counter()
+            if now >= deadline or not running():
+                return False, now - t0
+            time.sleep(min(poll, deadline - now))
+
+    def arm(self, item):
+        """Take a wait_change step's reference now (playback calls this before the click)"""
+        bbox = step_bbox(item)
+        self.detector.set_reference(self._grab_gray(bbox))
+        self._armed = bbox
+
+    def _start(self, kind, bbox):
+        if kind == "wait_change":
+            armed, self._armed = self._armed, None
+            if armed != bbox:
+                # Not armed - reference = how the region looks as the wait begins
+                self.detector.set_reference(self._grab_gray(bbox))
+        elif kind == "wait_text" and self.ocr is None:
+            from rimworld_ocr import create_ocr_backend
+            self.ocr = create_ocr_backend(self.ocr_name)
+
+    def _check_change(self, item, bbox):
+        return self.detector.changed(self._grab_gray(bbox))
+
+    def _check_pixel(self, item, bbox):
+        bgr = self._grab_bgr(bbox)
+        target = np.array(parse_color(item['color']), dtype=np.int16)
+        diff = np.abs(bgr.astype(np.int16) - target).max(axis=2)
+        return bool((diff <= item.get('tolerance', 0)).any())
+
+    def _check_text(self, item, bbox):
+        gray = self._grab_gray(bbox)
+        if self._binary is None or self._binary.shape != gray.shape:
+            self._binary = np.empty_like(gray)
+        cv2.threshold(gray, TEXT_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self._binary)
+        found = self.ocr.image_to_string(self._binary, psm=6)
+        if not text_matches(found, item['text'], self.match_distance):
+            # Dark text on a light background doesn't survive the threshold
+            found = self.ocr.image_to_string(gray, psm=6)
+            return text_matches(found, item['text'], self.match_distance)
+        return True
+
+    def close(self):
+        if self.ocr is not None:
+            self.ocr.close()
+            self.ocr = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
@@ -0,0 +1,291 @@
+"""
+Out-of-process recognition
+- Threshold + segmentation + OCR run in worker processes, away from Tk / hotkeys / logging
+- Frames go through a shared-memory ring (no pickling); only trait strings come back
+- Crashed or hung workers are restarted and the frame is retried once
+- The frame cache stays in this process: a repeat panel never reaches a worker
+- Same interface as TraitPipeline, so the roll engine doesn't care where OCR runs
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from rimworld_match import TraitMatcher
+from rimworld_pipeline import PanelResult, match_traits
+from rimworld_recognizer import KNOWN_TRAITS
+
+
+def _attach(name):
+    """Open an existing segment without handing it to this process' resource tracker"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class FrameRing:
+    """Fixed slots of uint8 frames in one shared-memory segment"""
+
+    def __init__(self, slot_bytes, slots):
+        self.slot_bytes = slot_bytes
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes * slots)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape):
+        return frame_view(self.shm, self.slot_bytes, slot, shape)
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def frame_view(shm, slot_bytes, slot, shape):
+    return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+
+
+def _worker_main(index, tasks, results, backend, cache_path, known, match_distance, ocr_threads, threshold):
+    """Worker process: attach to the ring, recognize frames, send back trait lists"""
+    import cv2
+    from rimworld_ocr import create_ocr_backend
+    from rimworld_recognizer import TraitImageDictionary, TraitRecognizer
+
+    class LearningDictionary(TraitImageDictionary):
+        """Remembers what it learned so the parent can persist it"""
+        def add(self, crop, text):
+            super().add(crop, text)
+            self.learned.append((crop.tobytes(), crop.shape, text))
+
+    ocr = create_ocr_backend(backend)
+    dictionary = LearningDictionary(cache_path)
+    dictionary.learned = []
+    try:
+        dictionary.load()
+    except Exception:
+        pass
+    recognizer = TraitRecognizer(ocr, dictionary, workers=ocr_threads)
+    recognizer.matcher = TraitMatcher(set(known), max_distance=match_distance)
+    results.put(("ready", index, ocr.name))
+
+    shm = None
+    binary = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        if task[0] == "known":
+            recognizer.matcher = TraitMatcher(set(task[1]), max_distance=task[2])
+            continue
+        _, seq, name, slot_bytes, slot, shape = task
+        try:
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                shm = _attach(name)
+            gray = frame_view(shm, slot_bytes, slot, shape)
+            t0 = time.perf_counter()
+            if binary is None or binary.shape != shape:
+                binary = np.empty(shape, dtype=np.uint8)
+            cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY, dst=binary)
+            t1 = time.perf_counter()
+            hits, misses = recognizer.hits, recognizer.misses
+            traits = recognizer.recognize(binary)
+            t2 = time.perf_counter()
+            learned, dictionary.learned = dictionary.learned, []
+            results.put(("ok", seq, traits, recognizer.unread, learned, t1 - t0, t2 - t1,
+                         recognizer.hits - hits, recognizer.misses - misses))
+        except Exception as e:
+            results.put(("error", seq, f"{type(e).__name__}: {e}"))
+
+    recognizer.close()
+    ocr.close()
+    if shm is not None:
+        shm.close()
+
+
+class _Worker:
+    def __init__(self, ctx, index, args):
+        self.index = index
+        self.tasks = ctx.Queue()
+        self.process = ctx.Process(target=_worker_main, args=(index, self.tasks) + args,
+                                   name=f"ocr-worker-{index}", daemon=True)
+        self.process.start()
+
+
+class RemoteStats:
+    """Cache hit / OCR counts summed over all workers"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+class ProcessPipeline:
+    """TraitPipeline look-alike that ships frames to worker processes"""
+
+    def __init__(self, ruleset, dictionary, backend="auto", workers=1, ocr_threads=1,
+                 match_distance=2, threshold=180, timeout=30.0, slots=None, log=None, frame_cache=None):
+        self.ruleset = ruleset
+        self.dictionary = dictionary  # Parent copy - learned images are merged here and saved
+        self.backend = backend
+        self.threshold = threshold
+        self.timeout = timeout        # Seconds before a silent worker counts as hung
+        self.log = log or (lambda msg: None)
+        self.recognizer = RemoteStats()
+        self.frame_cache = frame_cache
+        self._binary = None
+        self.match_distance = match_distance
+        self.matcher = TraitMatcher(set(ruleset.traits) | KNOWN_TRAITS, max_distance=match_distance)
+        self.ctx = mp.get_context("spawn")
+        self.results = self.ctx.Queue()
+        self.slots = slots or 2 * workers
+        self.ring = None
+        self.seq = 0
+        self.next_worker = 0
+        self.restarts = 0
+        self.ocr_threads = ocr_threads
+        self.workers = [self._spawn(i) for i in range(workers)]
+
+    def _spawn(self, index):
+        path = self.dictionary.path if self.dictionary is not None else None
+        known = sorted(set(self.ruleset.traits) | KNOWN_TRAITS)
+        args = (self.results, self.backend, path, known, self.match_distance, self.ocr_threads, self.threshold)
+        return _Worker(self.ctx, index, args)
+
+    def set_ruleset(self, ruleset, match_distance=2):
+        """New rules without restarting the workers"""
+        self.ruleset = ruleset
+        self.match_distance = match_distance
+        known = set(ruleset.traits) | KNOWN_TRAITS
+        self.matcher = TraitMatcher(known, max_distance=match_distance)
+        for w in self.workers:
+            w.tasks.put(("known", sorted(known), match_distance))
+
+    def _restart(self, worker, why):
+        self.restarts += 1
+        self.log(f"OCR worker {worker.index} {why} - restarting")
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.process.join(1.0)
+        self.workers[worker.index] = new = self._spawn(worker.index)
+        return new
+
+    def _frame_slot(self, gray):
+        """Copy the frame into the next ring slot (ring grows if frames get bigger)"""
+        if self.ring is None or gray.nbytes > self.ring.slot_bytes:
+            if self.ring is not None:
+                self.ring.close()
+            self.ring = FrameRing(gray.nbytes, self.slots)
+        slot = self.seq % self.slots
+        np.copyto(self.ring.view(slot, gray.shape), gray)
+        return slot
+
+    def _recognize(self, gray):
+        """-> (traits, unread cells, threshold s, recognize s, failed)
+        failed: the worker errored or kept dying / hanging - traits is empty, not a blank panel"""
+        self.seq += 1
+        seq = self.seq
+        slot = self._frame_slot(gray)
+        task = ("frame", seq, self.ring.name, self.ring.slot_bytes, slot, gray.shape)
+
+        worker = self.workers[self.next_worker % len(self.workers)]
+        self.next_worker += 1
+        worker.tasks.put(task)
+        deadline = time.monotonic() + self.timeout
+        retried = False
+        while True:
+            try:
+                msg = self.results.get(timeout=0.25)
+            except queue.Empty:
+                dead = not worker.process.is_alive()
+                if not dead and time.monotonic() < deadline:
+                    continue
+                worker = self._restart(worker, f"exited ({worker.process.exitcode})" if dead else "hung")
+                if retried:
+                    return [], 0, 0.0, 0.0, True
+                retried = True
+                worker.tasks.put(task)
+                deadline = time.monotonic() + self.timeout
+                continue
+
+            kind = msg[0]
+            if kind == "ready":
+                self.log(f"OCR worker {msg[1]} ready ({msg[2]})")
+                continue
+            if msg[1] != seq:
+                continue  # Late answer for a frame we already gave up on
+            if kind == "error":
+                self.log(f"OCR worker error: {msg[2]}")
+                return [], 0, 0.0, 0.0, True
+            _, _, traits, unread, learned, t_threshold, t_recognize, hits, misses = msg
+            self.recognizer.hits += hits
+            self.recognizer.misses += misses
+            if learned and self.dictionary is not None:
+                for data, shape, text in learned:
+                    crop = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+                    # Another worker may have learned the same image already
+                    if self.dictionary.lookup(crop) != text:
+                        self.dictionary.add(crop, text)
+            return traits, unread, t_threshold, t_recognize, False
+
+    def process(self, gray):
+        """Grayscale panel -> PanelResult (matching + rules stay in this process)"""
+        cache = self.frame_cache
+        key = traits = None
+        if cache is not None:
+            t0 = time.perf_counter()
+            if self._binary is None or self._binary.shape != gray.shape:
+                self._binary = np.empty_like(gray)
+            cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY, dst=self._binary)
+            key = cache.key(self._binary)
+            traits = cache.get(key)
+            if traits is not None:
+                t1 = time.perf_counter()
+                mask, conf, resolved = match_traits(traits, self.matcher, self.ruleset.vocab)
+                rule = self.ruleset.evaluate(mask, resolved) if traits else None
+                return PanelResult(traits, mask, conf, rule,
+                                   {"threshold": t1 - t0, "recognize": 0.0, "ipc": 0.0,
+                                    "match": time.perf_counter() - t1})
+
+        t0 = time.perf_counter()
+        traits, unread, t_threshold, t_recognize, failed = self._recognize(gray)
+        t1 = time.perf_counter()
+
+        mask, conf, resolved = match_traits(traits, self.matcher, self.ruleset.vocab, unread)
+        # Unread / unknown cells: a NOT rule might be excluding exactly that trait
+        rule = self.ruleset.evaluate(mask, resolved) if traits else None
+        # A failed frame has no traits because nothing was read, not because there are none
+        if key is not None and resolved and not failed:
+            cache.put(key, traits)
+        t2 = time.perf_counter()
+
+        # "ipc" = round trip minus the work the worker reported
+        return PanelResult(traits, mask, conf, rule,
+                           {"threshold": t_threshold, "recognize": t_recognize,
+                            "ipc": max(0.0, t1 - t0 - t_threshold - t_recognize), "match": t2 - t1})
+
+    def close(self):
+        for w in self.workers:
+            try:
+                w.tasks.put(None)
+            except Exception:
+                pass
+        for w in self.workers:
+            w.process.join(2.0)
+            if w.process.is_alive():
+                w.process.terminate()
+        self.workers = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None